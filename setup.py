@@ -14,11 +14,11 @@ setup(
     ]},
     install_requires=[
         "matplotlib",
+        "numpy",
         "reportlab",
         "urwid",
         "urwid-utils>=0.1.2",
         "six",
-        "raccoon>=3.0.0",
         "orderedattrdict"
     ]
 )
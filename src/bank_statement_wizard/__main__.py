@@ -1,13 +1,15 @@
 import argparse
-from typing import List
+from typing import List, Optional
 
 from bank_statement_wizard.ui import run_ui
-from bank_statement_wizard.domain.ledger import Ledger
+from bank_statement_wizard.domain.ledger import Ledger, Direction
+from bank_statement_wizard.domain.store import SqliteLedgerStore
 from bank_statement_wizard.domain.utility import load_category_data, check_date
-from bank_statement_wizard.domain.analysis import SimpleExpenseCategoryMatcher, \
-    group_transactions_using_category, get_expense_stats_for_transaction_groups
+from bank_statement_wizard.domain.analysis import SimpleExpenseCategoryMatcher, get_category_stats_for_ledger
 from bank_statement_wizard.report_generation import StatementReportGenerator
-from bank_statement_wizard.parsing.support import get_loader, statement_types
+from bank_statement_wizard.parsing.cache import StatementCache
+from bank_statement_wizard.parsing.support import iter_transactions_from_statement, statement_types, \
+    load_transactions_from_statements
 
 
 __all__ = ["main"]
@@ -23,33 +25,60 @@ def parse_arguments():
                         choices=statement_types(), help="Statement type", required=True)
     parser.add_argument("-o", "--output", help="Output directory path",
                         required=True)
+    parser.add_argument("-b", "--batch_size", type=int, default=Ledger.default_batch_size,
+                        help="Number of transactions added to the ledger at once")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="Number of processes used to parse and categorise the statements")
+    parser.add_argument("-c", "--cache_dir", help="Directory to cache the parsed statements in")
+    parser.add_argument("--store", help="SQLite database to keep the transactions in")
     args = parser.parse_args()
-    return args.expense_categories, args.statements, args.type, args.output
+    return args.expense_categories, args.statements, args.type, args.output, args.batch_size, args.jobs, \
+        args.cache_dir, args.store
+
+
+def parse_ui_arguments():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--snapshot",
+                        help="Ledger snapshot to open if it exists, the export menu saves the ledger to it")
+    args = parser.parse_args()
+    return args.snapshot,
 
 
 def process_statement(
     expense_categories_file: str,
     statement_paths: List[str],
     statement_type: str,
-    path_to_output_dir: str
+    path_to_output_dir: str,
+    batch_size: int = Ledger.default_batch_size,
+    jobs: int = 1,
+    cache_dir: Optional[str] = None,
+    path_to_store: Optional[str] = None
 ):
-    ledger = Ledger()
+    store = SqliteLedgerStore(path_to_store) if path_to_store else None
+    ledger = store.load_ledger() if store is not None else Ledger()
+    cache = StatementCache(cache_dir) if cache_dir else None
 
-    for statement in statement_paths:
-        transactions = get_loader(statement_type)(statement)
-        ledger.add_transactions(transactions)
+    if jobs > 1 or cache is not None:
+        ledger.add_transactions(load_transactions_from_statements(statement_paths, statement_type, jobs, cache))
+    else:
+        for statement in statement_paths:
+            ledger.add_transactions_in_batches(iter_transactions_from_statement(statement, statement_type),
+                                               batch_size)
 
     expense_categories = load_category_data(expense_categories_file)
     matcher = SimpleExpenseCategoryMatcher(expense_categories)
-    matcher.match_bulk(ledger.transactions)
+    matcher.match_bulk(ledger.transactions, jobs=jobs)
+
+    if store is not None:
+        store.add_transactions(ledger.transactions)
+        store.update_categories(ledger.transactions)
+        store.close()
 
     print("\n{}\n".format(ledger))
 
     if ledger.debit_balance > 0.0:
-        grouped_debit_transactions = group_transactions_using_category(
-            ledger.debit_transactions)
-        expense_stats = get_expense_stats_for_transaction_groups(
-            grouped_debit_transactions, ledger.debit_balance)
+        expense_stats = {category: stats for category, stats in
+                         get_category_stats_for_ledger(ledger, Direction.debit).items() if category}
     else:
         expense_stats = None
 
@@ -64,4 +93,4 @@ def process_statement(
 
 def main():
     # process_statement(*parse_arguments())
-    run_ui()
+    run_ui(*parse_ui_arguments())
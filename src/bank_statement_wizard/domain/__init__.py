@@ -1,4 +1,7 @@
 from .utility import *
 from .date_range import *
+from .pivot import *
 from .ledger import *
 from .analysis import *
+from .store import *
+from .snapshot import *
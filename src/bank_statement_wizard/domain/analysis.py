@@ -1,11 +1,18 @@
 import re
-from typing import Dict, List, Optional, Tuple
+from itertools import chain
+from collections import OrderedDict
+from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple, Sequence
 
-from .ledger import Transaction
-from .utility import filter_non_alphanumeric
+import numpy as np
 
-__all__ = ["ExpenseCategory", "SimpleExpenseCategoryMatcher", "group_transactions_using_category",
-           "get_expense_stats_for_transaction_groups"]
+from .ledger import Transaction, BaseLedger, Direction
+from .utility import filter_non_alphanumeric, iter_batches
+
+__all__ = ["ExpenseCategory", "MatchCacheInfo", "SimpleExpenseCategoryMatcher", "group_transactions_using_category",
+           "get_expense_stats_for_transaction_groups", "CategoryStats", "aggregate_category_codes",
+           "aggregate_by_category", "get_category_stats_for_ledger"]
 
 
 ExpenseCategory = str
@@ -28,30 +35,195 @@ def get_match_score_for_category(
     return max(scores)
 
 
+_REGEX_SPECIAL_CHARS = frozenset(".^$*+?{}[]\\|()")
+
+
+def is_literal_pattern(pattern: str) -> bool:
+    return not _REGEX_SPECIAL_CHARS.intersection(pattern)
+
+
+def _trie_to_pattern(trie: Dict[str, Dict]) -> str:
+    # the end of a keyword is marked by an empty key, continuing to a longer keyword is tried first so the longest
+    # keyword starting at a position is matched
+    alternatives = [re.escape(char) + _trie_to_pattern(child) for char, child in trie.items() if char]
+    if not alternatives:
+        return ""
+    pattern = "(?:" + "|".join(alternatives) + ")"
+    return pattern + "?" if "" in trie else pattern
+
+
+def compile_keywords(keywords: List[str]) -> "re.Pattern":
+    """
+    Compiles literal keywords into a single case insensitive pattern matching the longest keyword starting at every
+    position of the target, overlapping matches included.
+    """
+    trie: Dict[str, Dict] = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword.lower():
+            node = node.setdefault(char, {})
+        node[""] = {}
+    return re.compile(f"(?=({_trie_to_pattern(trie)}))", re.IGNORECASE)
+
+
+def normalise_description(description: str) -> str:
+    # matching ignores case, lowering is only safe when it does not change the length, i.e. the score
+    description = filter_non_alphanumeric(description)
+    return description.lower() if description.isascii() else description
+
+
+@dataclass
+class MatchCacheInfo:
+    hits: int
+    misses: int
+    max_size: int
+    size: int
+
+
 class SimpleExpenseCategoryMatcher:
 
     def __init__(
         self,
         expense_category_data: Dict[ExpenseCategory, List[str]],
-        default_expense_category: Optional[str] = "unidentified"
+        default_expense_category: Optional[str] = "unidentified",
+        cache_size: int = 65536
     ):
-        self.expense_category_data = expense_category_data
         self.default_expense_category = default_expense_category
+        self.rules_version: int = 0
+        # best category, None if nothing matches, per (normalised description, rules version) in LRU order
+        self._cache: "OrderedDict[Tuple[str, int], Optional[ExpenseCategory]]" = OrderedDict()
+        self._cache_size = cache_size
+        self._cache_hits = 0
+        self._cache_misses = 0
+        self.update_rules(expense_category_data)
 
-    def match_category_to_expense(self, expense: Transaction) -> ExpenseCategory:
-        category_scores = {category_name: get_match_score_for_category(category_data, expense)
-                           for category_name, category_data in self.expense_category_data.items()}
-        expense_category = max(category_scores.items(), key=lambda x: x[1])[0]
-        matching_score = category_scores[expense_category]
+    def update_rules(self, expense_category_data: Dict[ExpenseCategory, List[str]]):
+        self.expense_category_data = expense_category_data
+        self.rules_version += 1
+        self._compile()
+
+    def cache_info(self) -> MatchCacheInfo:
+        return MatchCacheInfo(hits=self._cache_hits, misses=self._cache_misses, max_size=self._cache_size,
+                              size=len(self._cache))
+
+    def clear_cache(self):
+        self._cache.clear()
+        self._cache_hits = self._cache_misses = 0
+
+    def _compile(self):
+        patterns = [p for category_data in self.expense_category_data.values() for p in category_data]
+        self._category_order = {category: n for n, category in enumerate(self.expense_category_data)}
+        self._compiled_patterns = {category: [re.compile(p, re.IGNORECASE) for p in category_data]
+                                   for category, category_data in self.expense_category_data.items()}
+        self._keyword_pattern: Optional["re.Pattern"] = None
+        self._keyword_categories: Dict[str, List[ExpenseCategory]] = {}
+
+        if patterns and all(p and p.isascii() and is_literal_pattern(p) for p in patterns):
+            # the score of a literal keyword is its length, so only the longest keywords found matter
+            for category, category_data in self.expense_category_data.items():
+                for keyword in category_data:
+                    self._keyword_categories.setdefault(keyword.lower(), []).append(category)
+            self._keyword_pattern = compile_keywords(list(self._keyword_categories))
+
+    def _best_category_and_score(self, target: str) -> Tuple[Optional[ExpenseCategory], float]:
+        if self._keyword_pattern is None:
+            return self._best_category_and_score_using_patterns(target)
+
+        found = [m.group(1) for m in self._keyword_pattern.finditer(target)]
+        if not found:
+            return None, 0.0
+        longest = max(len(i) for i in found)
+        # keywords of the same length found at the same position are equal, so the longest keywords found at every
+        # position give all the categories with the best score
+        candidates = set()
+        for keyword in found:
+            if len(keyword) == longest:
+                categories = self._keyword_categories.get(keyword.lower())
+                if categories is None:  # case insensitive matching beyond ascii, e.g. the kelvin sign
+                    return self._best_category_and_score_using_patterns(target)
+                candidates.update(categories)
+        return min(candidates, key=self._category_order.__getitem__), float(longest) / float(len(target))
+
+    def _best_category_and_score_using_patterns(self, target: str) -> Tuple[Optional[ExpenseCategory], float]:
+        best_category, best_score = None, 0.0
+        for category, patterns in self._compiled_patterns.items():
+            for pattern in patterns:
+                match = pattern.search(target)
+                score = float(len(match.group(0))) / float(len(target)) if match else 0.0
+                if best_category is None or score > best_score:
+                    best_category, best_score = category, score
+        return best_category, best_score
 
+    def _match_normalised_description(self, target: str) -> Optional[ExpenseCategory]:
+        key = (target, self.rules_version)
+        if key in self._cache:
+            self._cache_hits += 1
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        self._cache_misses += 1
+        expense_category, matching_score = self._best_category_and_score(target)
         if matching_score < 1e-3:
+            expense_category = None
+        self._remember(key, expense_category)
+        return expense_category
+
+    def _remember(self, key: Tuple[str, int], expense_category: Optional[ExpenseCategory]):
+        if self._cache_size > 0:
+            self._cache[key] = expense_category
+            if len(self._cache) > self._cache_size:
+                self._cache.popitem(last=False)
+
+    def match_category_to_expense(self, expense: Transaction) -> ExpenseCategory:
+        expense_category = self._match_normalised_description(normalise_description(expense.description))
+
+        if expense_category is None:
             expense_category = self.default_expense_category
 
         expense.category = expense_category
         return expense_category
 
-    def match_bulk(self, expenses: List[Transaction]) -> List[ExpenseCategory]:
-        return [self.match_category_to_expense(i) for i in expenses]
+    def match_bulk(self, expenses: List[Transaction], jobs: int = 1, chunk_size: int = 10000
+                   ) -> List[ExpenseCategory]:
+        """
+        With jobs > 1 the unique descriptions which are not in the cache are matched in worker processes, in chunks
+        of `chunk_size`. The rules are sent to every worker once when the pool starts.
+        """
+        if jobs <= 1:
+            return [self.match_category_to_expense(i) for i in expenses]
+
+        targets = [normalise_description(i.description) for i in expenses]
+        unmatched = [i for i in dict.fromkeys(targets) if (i, self.rules_version) not in self._cache]
+        matched: Dict[str, Optional[ExpenseCategory]] = {}
+        if unmatched:
+            with ProcessPoolExecutor(max_workers=jobs, initializer=_initialize_matcher_worker,
+                                     initargs=(self.expense_category_data,)) as executor:
+                results = executor.map(_match_in_matcher_worker, iter_batches(unmatched, chunk_size))
+                matched = dict(zip(unmatched, chain.from_iterable(results)))
+            self._cache_misses += len(matched)
+            for target, expense_category in matched.items():
+                self._remember((target, self.rules_version), expense_category)
+
+        expense_categories = []
+        for expense, target in zip(expenses, targets):
+            expense_category = matched[target] if target in matched else self._match_normalised_description(target)
+            if expense_category is None:
+                expense_category = self.default_expense_category
+            expense.category = expense_category
+            expense_categories.append(expense_category)
+        return expense_categories
+
+
+_WORKER_MATCHER: Optional[SimpleExpenseCategoryMatcher] = None
+
+
+def _initialize_matcher_worker(expense_category_data: Dict[ExpenseCategory, List[str]]):
+    global _WORKER_MATCHER
+    _WORKER_MATCHER = SimpleExpenseCategoryMatcher(expense_category_data, cache_size=0)
+
+
+def _match_in_matcher_worker(targets: List[str]) -> List[Optional[ExpenseCategory]]:
+    return [_WORKER_MATCHER._match_normalised_description(i) for i in targets]
 
 
 def group_transactions_using_category(transactions: List[Transaction]) -> Dict[str, List[Transaction]]:
@@ -66,10 +238,72 @@ def group_transactions_using_category(transactions: List[Transaction]) -> Dict[s
 
 def get_expense_stats_for_transaction_groups(
         grouped_transactions: Dict[str, List[Transaction]], balance: float) -> Optional[Dict[str, Tuple[float, float]]]:
-    _stats = {}
-    for category, transactions in grouped_transactions.items():
-        _total = abs(sum([i.amount for i in transactions]))
-        _percentage = _total / balance
-        _stats[category] = (_total, _percentage)
-    assert sum([i[1] for i in _stats.values()]) - 1.0 < 1e-3
+    categories = [category for category, transactions in grouped_transactions.items() for _ in transactions]
+    amounts = [t.amount for transactions in grouped_transactions.values() for t in transactions]
+    _stats = {category: (stats.total, stats.share)
+              for category, stats in aggregate_by_category(categories, amounts, balance).items()}
+    assert abs(sum([i[1] for i in _stats.values()]) - 1.0) < 1e-3
     return _stats
+
+
+@dataclass
+class CategoryStats:
+    total: float  # absolute value of the sum of the amounts
+    count: int
+    mean: float  # mean amount, signed
+    share: float  # total over the balance, the sum of the totals by default
+
+
+def aggregate_category_codes(
+    codes: np.ndarray,
+    amounts: np.ndarray,
+    categories: Sequence[Optional[ExpenseCategory]],
+    balance: Optional[float] = None
+) -> Dict[Optional[ExpenseCategory], CategoryStats]:
+    """
+    Aggregates amounts per category in one pass, `codes` are the positions of the transaction categories in
+    `categories`. Shares are relative to `balance`, the sum of the category totals by default so they add up to one
+    even when debits and credits of a category cancel out.
+    """
+    amounts = np.asarray(amounts, dtype=np.float64)
+    sums = np.bincount(codes, weights=amounts, minlength=len(categories))
+    counts = np.bincount(codes, minlength=len(categories))
+    totals = np.abs(sums)
+    balance = float(totals.sum()) if balance is None else balance
+    shares = totals / balance if balance else np.zeros(len(categories))
+    means = np.divide(sums, counts, out=np.zeros(len(categories)), where=counts > 0)
+
+    return {category: CategoryStats(total=float(totals[n]), count=int(counts[n]), mean=float(means[n]),
+                                    share=float(shares[n]))
+            for n, category in enumerate(categories) if counts[n] > 0}
+
+
+def aggregate_by_category(
+    categories: Sequence[Optional[ExpenseCategory]],
+    amounts: Sequence[float],
+    balance: Optional[float] = None
+) -> Dict[Optional[ExpenseCategory], CategoryStats]:
+    category_codes: Dict[Optional[ExpenseCategory], int] = {}
+    codes = np.fromiter((category_codes.setdefault(i, len(category_codes)) for i in categories), dtype=np.intp,
+                        count=len(categories))
+    return aggregate_category_codes(codes, np.asarray(amounts, dtype=np.float64), list(category_codes), balance)
+
+
+def get_category_stats_for_ledger(
+    ledger: BaseLedger,
+    direction: Optional[Direction] = None
+) -> Dict[Optional[ExpenseCategory], CategoryStats]:
+    """
+    Category stats of all, debit or credit transactions of a ledger, transactions without a category are
+    aggregated under None. Shares are relative to the sum of the category totals, so without a direction the total
+    of a category with both debits and credits is its net amount.
+    """
+    codes, categories = ledger.category_codes()
+    amounts = ledger.balance_history.amounts
+    if direction is Direction.debit:
+        mask = amounts < 0
+    elif direction is Direction.credit:
+        mask = amounts > 0
+    else:
+        mask = slice(None)
+    return aggregate_category_codes(codes[mask], amounts[mask], categories)
@@ -1,19 +1,48 @@
-from copy import deepcopy
+import abc
+import heapq
+import weakref
+from enum import Enum, unique
 from datetime import date
-from uuid import uuid5, UUID
-from typing import List, Optional, Any, Tuple, Dict, NewType, Callable
+from bisect import bisect_left, bisect_right
+from uuid import UUID
+from hashlib import sha1
+from typing import List, Optional, Any, Tuple, Dict, NewType, Callable, Iterable, Set, Iterator, Sequence
+
+import numpy as np
 
 from .date_range import DateRange, DateRangeElement, Inclusivity
+from .utility import iter_batches
+from .pivot import Period, CategoryPivot
 
 
-__all__ = ["TransactionId", "Transaction", "Ledger"]
+__all__ = ["TransactionId", "Transaction", "LedgerState", "BalanceHistory", "Direction", "BaseLedger", "Ledger",
+           "LedgerView"]
 
 
 TransactionId = NewType("TransactionId", UUID)
 
 
+@unique
+class Direction(str, Enum):
+    debit = "debit"  # money spent/withdrawn
+    credit = "credit"  # money deposited
+
+
+class CategoryRevision:
+    """
+    Counter of the category assignments to the transactions of a ledger, shared by the ledger and its transactions.
+    """
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value: int = 0
+
+
 class Transaction:
+    __slots__ = ("_amount", "_date", "_description", "_info", "_id", "_category", "_category_revisions")
+
     _namespace = UUID("e0505487-55f2-4b8c-9218-6fd03b87138b")
+    _namespace_hash = sha1(_namespace.bytes)
 
     def __init__(
         self,
@@ -27,9 +56,10 @@ class Transaction:
         self._date: date = date
         self._description: Optional[str] = description
         self._info: Optional[str] = info
-        self._id: TransactionId = self._generate_id()
-
-        self.category: str = category
+        self._id: Optional[TransactionId] = None  # generated on first access
+        self._category: Optional[str] = category
+        # revisions of the ledgers holding the transaction, incremented on every category assignment
+        self._category_revisions: Tuple[CategoryRevision, ...] = ()
 
     @staticmethod
     def fields() -> Tuple[str, ...]:
@@ -51,17 +81,39 @@ class Transaction:
     def info(self) -> str:
         return str(self._info)
 
+    @property
+    def category(self) -> Optional[str]:
+        return self._category
+
+    @category.setter
+    def category(self, category: Optional[str]):
+        self._category = category
+        for revision in self._category_revisions:
+            revision.value += 1
+
     @property
     def id(self) -> TransactionId:
+        if self._id is None:
+            self._id = self._generate_id()
         return self._id
 
+    @staticmethod
+    def generate_ids(transactions: Iterable["Transaction"]):
+        for t in transactions:
+            if t._id is None:
+                t._id = t._generate_id()
+
     def dict(self) -> Dict[str, Any]:
         d = {f: getattr(self, f) for f in self.fields()}
         d.update({"id": self.id})
         return d
 
     def _generate_id(self) -> TransactionId:
-        return TransactionId(uuid5(self._namespace, f"{self.date},{self.description},{self.amount:.2f},{self.info}"))
+        # same as uuid5(self._namespace, name) without hashing the namespace again for every transaction
+        name = f"{self._date},{self._description},{self._amount:.2f},{self._info}"
+        digest = self._namespace_hash.copy()
+        digest.update(name.encode("utf-8"))
+        return TransactionId(UUID(bytes=digest.digest()[:16], version=5))
 
     def __str__(self):
         return f"Date                  : {self.date}" \
@@ -96,11 +148,110 @@ class LedgerState:
         return _output
 
 
-class Ledger:
-    # https://en.wikipedia.org/wiki/Debits_and_credits#Terminology
+class BalanceHistory:
+    """
+    Ledger states after each transaction, stored as prefix sums of the credit and debit amounts. States are created
+    on access, `dates` is shared with the ledger.
+    """
+
+    def __init__(self, dates: List[date]):
+        self.dates = dates
+        self._amounts: np.ndarray = np.zeros(0)
+        self._credit_balances: np.ndarray = np.zeros(0)
+        self._debit_balances: np.ndarray = np.zeros(0)
+        self._size: int = 0
+
+    @property
+    def amounts(self) -> np.ndarray:
+        return self._amounts[:self._size]
+
+    @property
+    def credit_balances(self) -> np.ndarray:
+        return self._credit_balances[:self._size]
+
+    @property
+    def debit_balances(self) -> np.ndarray:
+        return self._debit_balances[:self._size]
+
+    @property
+    def balances(self) -> np.ndarray:
+        return self.credit_balances - self.debit_balances
+
+    def update(self, start: int, amounts: Iterable[float]):
+        """
+        Recomputes the balances from `start` onwards given the amounts of all transactions from `start`.
+        """
+        amounts = amounts if isinstance(amounts, np.ndarray) else np.fromiter(amounts, dtype=np.float64)
+        size = start + len(amounts)
+        self._reserve(size)
+        self._amounts[start:size] = amounts
+        for balances, partial_amounts in ((self._credit_balances, np.where(amounts > 0, amounts, 0.0)),
+                                          (self._debit_balances, np.where(amounts < 0, -amounts, 0.0))):
+            # accumulate on top of the previous balance so the sums are identical to a full recomputation
+            previous = balances[start - 1] if start > 0 else 0.0
+            balances[start:size] = np.cumsum(np.concatenate(([previous], partial_amounts)))[1:]
+        self._size = size
+
+    def _reserve(self, size: int):
+        if size > len(self._credit_balances):
+            capacity = max(size, 2 * len(self._credit_balances))
+            for name in ("_amounts", "_credit_balances", "_debit_balances"):
+                balances = np.zeros(capacity)
+                balances[:self._size] = getattr(self, name)[:self._size]
+                setattr(self, name, balances)
+
+    def __getitem__(self, index: int) -> LedgerState:
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("balance history index out of range")
+        return LedgerState(self.dates[index], float(self._credit_balances[index]),
+                           float(self._debit_balances[index]))
+
+    def __iter__(self) -> Iterator[LedgerState]:
+        for date_, credit_balance, debit_balance in zip(self.dates, self.credit_balances.tolist(),
+                                                        self.debit_balances.tolist()):
+            yield LedgerState(date_, credit_balance, debit_balance)
+
+    def __len__(self) -> int:
+        return self._size
+
+
+class PositionIndex:
+    """
+    Sorted positions of the ledger transactions per key, e.g. per category. Positions are only ever appended in
+    ascending order, changes in the middle of the ledger truncate the index from there and extend it again.
+    """
+
     def __init__(self):
-        self.transactions: List[Transaction] = []
-        self.balance_history: List[LedgerState] = []
+        self._positions: Dict[Any, List[int]] = {}
+
+    def keys(self) -> List[Any]:
+        return list(self._positions)
+
+    def get(self, key: Any) -> List[int]:
+        return self._positions.get(key, [])
+
+    def truncate(self, start: int):
+        for key in list(self._positions):
+            positions = self._positions[key]
+            del positions[bisect_left(positions, start):]
+            if not positions:
+                del self._positions[key]
+
+    def extend(self, start: int, keys: Iterable[Any]):
+        for position, key in enumerate(keys, start):
+            if key not in self._positions:
+                self._positions[key] = []
+            self._positions[key].append(position)
+
+
+class BaseLedger(abc.ABC):
+    """
+    Queries shared by ledgers and ledger views, both provide date sorted `transactions` and their `balance_history`.
+    """
+    transactions: List[Transaction]
+    balance_history: BalanceHistory
 
     @property
     def _latest_state(self) -> LedgerState:
@@ -130,39 +281,98 @@ class Ledger:
     def date_range(self) -> DateRange:
         return DateRange(
             start=DateRangeElement(
-                date=self.transactions[0].date,
+                date=self.first_transaction.date,
                 inclusivity=Inclusivity.closed
             ),
             end=DateRangeElement(
-                date=self.transactions[-1].date,
+                date=self.last_transaction.date,
                 inclusivity=Inclusivity.closed
             ),
         )
 
-    def add_transaction(self, transaction: Transaction) -> "Ledger":
-        return self.add_transactions([transaction])
+    @property
+    def transaction_ids(self) -> List[TransactionId]:
+        return [t.id for t in self.transactions]
 
-    def add_transactions(self, transactions: List[Transaction]) -> "Ledger":
-        self.transactions += transactions
-        self.transactions = list(set(self.transactions))
-        self.transactions.sort(key=lambda t: t.date)
-        self._compute_balance_history()
-        return self
+    def transaction(self, position: int) -> Transaction:
+        return self.transactions[position]
 
-    def _compute_balance_history(self):
-        self.balance_history = []
-        state = LedgerState()
-        for t in self.transactions:
-            state = state.apply(t)
-            self.balance_history.append(state)
-
-    def filtered(self, is_filtered: Callable[[Transaction], bool]) -> "Ledger":
-        filtered_transactions: List[Transaction] = []
-        for t in self.transactions:
-            if is_filtered(t):
-                continue
-            filtered_transactions.append(deepcopy(t))
-        return Ledger().add_transactions(filtered_transactions)
+    @property
+    def first_transaction(self) -> Transaction:
+        return self.transaction(0)
+
+    @property
+    def last_transaction(self) -> Transaction:
+        return self.transaction(-1)
+
+    def columns(self) -> Dict[str, Sequence]:
+        """
+        Returns the transaction fields as columns, dates and amounts are taken from the balance history.
+        """
+        transactions = self.transactions
+        return {
+            "date": self.balance_history.dates,
+            "description": [t.description for t in transactions],
+            "amount": self.balance_history.amounts,
+            "info": [t.info for t in transactions],
+            "category": [t.category for t in transactions],
+        }
+
+    def date_range_positions(self, date_range: DateRange) -> Tuple[int, int]:
+        """
+        Returns the start and end positions of the transactions within the date range, in O(log n).
+        """
+        dates = self.balance_history.dates
+        start = (bisect_left if date_range.start.inclusivity is Inclusivity.closed else bisect_right)(
+            dates, date_range.start.date)
+        end = (bisect_right if date_range.end.inclusivity is Inclusivity.closed else bisect_left)(
+            dates, date_range.end.date)
+        return start, max(start, end)
+
+    def sliced(self, date_range: DateRange) -> "BaseLedger":
+        start, end = self.date_range_positions(date_range)
+        return self._select(slice(start, end))
+
+    def state_at(self, at: date) -> LedgerState:
+        """
+        Returns the ledger state after all the transactions up to and including the given date, in O(log n).
+        """
+        position = bisect_right(self.balance_history.dates, at)
+        if position == 0:
+            return LedgerState(at)
+        state = self.balance_history[position - 1]
+        return LedgerState(at, state.credit_balance, state.debit_balance)
+
+    def balance_at(self, at: date) -> float:
+        return self.state_at(at).balance
+
+    def category_codes(self) -> Tuple[np.ndarray, List[Optional[str]]]:
+        """
+        Returns the position of every transaction's category in the returned list of categories.
+        """
+        codes: Dict[Optional[str], int] = {}
+        return np.fromiter((codes.setdefault(t.category, len(codes)) for t in self.transactions), dtype=np.intp,
+                           count=len(self)), list(codes)
+
+    def pivot(self, period: Period = Period.monthly, direction: Optional[Direction] = None) -> CategoryPivot:
+        """
+        Aggregates the amounts of all, debit or credit transactions per category and period in one pass.
+        """
+        codes, categories = self.category_codes()
+        amounts = self.balance_history.amounts
+        dates = np.array(self.balance_history.dates, dtype="datetime64[D]")
+        if direction is not None:
+            mask = amounts < 0 if direction is Direction.debit else amounts > 0
+            codes, dates, amounts = codes[mask], dates[mask], amounts[mask]
+        pivot = CategoryPivot(period)
+        pivot.add_category_codes(codes, categories, dates, amounts)
+        return pivot
+
+    @abc.abstractmethod
+    def _select(self, positions: slice) -> "BaseLedger":
+        """
+        Returns the transactions at the positions as a ledger view, see `sliced`.
+        """
 
     def __len__(self) -> int:
         return len(self.transactions)
@@ -172,3 +382,224 @@ class Ledger:
                f"Debit Balance    : {self.debit_balance:.2f}\n" \
                f"--------------\n" \
                f"Balance          : {self.balance:.2f}"
+
+
+class Ledger(BaseLedger):
+    # https://en.wikipedia.org/wiki/Debits_and_credits#Terminology
+    default_batch_size = 10000
+
+    def __init__(self):
+        self.transactions: List[Transaction] = []
+        self._transaction_ids: Set[TransactionId] = set()
+        self._dates: List[date] = []  # dates of the transactions, to bisect on
+        self.balance_history: BalanceHistory = BalanceHistory(self._dates)
+        self._revision: int = 0  # incremented on every change, invalidates views
+
+        self._direction_index: PositionIndex = PositionIndex()
+        self._info_index: PositionIndex = PositionIndex()
+        # categories are assigned to transactions directly, the index is rebuilt on first query after a change
+        self._category_index: PositionIndex = PositionIndex()
+        self._category_index_revision: Optional[int] = None
+        self._category_revision: CategoryRevision = CategoryRevision()
+        self._category_revisions: Tuple[CategoryRevision, ...] = (self._category_revision,)
+        # pivots handed out by `pivot` and their directions, updated with the transactions added later on
+        self._pivots: "weakref.WeakKeyDictionary[CategoryPivot, Optional[Direction]]" = weakref.WeakKeyDictionary()
+
+    def add_transaction(self, transaction: Transaction) -> "Ledger":
+        return self.add_transactions([transaction])
+
+    def add_transactions(self, transactions: List[Transaction]) -> "Ledger":
+        new_transactions = []
+        for t in transactions:
+            if t.id not in self._transaction_ids:
+                self._transaction_ids.add(t.id)
+                new_transactions.append(t)
+                if not t._category_revisions:
+                    t._category_revisions = self._category_revisions
+                elif self._category_revision not in t._category_revisions:
+                    t._category_revisions += self._category_revisions
+        if not new_transactions:
+            return self
+
+        # transactions of the same date keep their insertion order, existing ones come first
+        new_transactions.sort(key=lambda t: t.date)
+        position = bisect_right(self._dates, new_transactions[0].date)
+        if position == len(self.transactions):
+            self.transactions += new_transactions
+        else:
+            later_transactions = self.transactions[position:]
+            del self.transactions[position:]
+            self.transactions += heapq.merge(later_transactions, new_transactions, key=lambda t: t.date)
+
+        self._compute_balance_history(start=position)
+        self._revision += 1
+        for pivot, direction in list(self._pivots.items()):
+            pivot.add_transactions([t for t in new_transactions if direction is None or
+                                    (t.amount < 0 if direction is Direction.debit else t.amount > 0)])
+        return self
+
+    def add_transactions_in_batches(self, transactions: Iterable[Transaction],
+                                    batch_size: Optional[int] = None) -> "Ledger":
+        for batch in iter_batches(transactions, batch_size or self.default_batch_size):
+            self.add_transactions(batch)
+        return self
+
+    def _compute_balance_history(self, start: int = 0):
+        self._dates[start:] = [t.date for t in self.transactions[start:]]
+        self.balance_history.update(start, (t.amount for t in self.transactions[start:]))
+        self._update_indexes(start)
+
+    def _update_indexes(self, start: int):
+        amounts = self.balance_history.amounts[start:].tolist()
+        self._direction_index.truncate(start)
+        self._direction_index.extend(start, (Direction.debit if a < 0 else Direction.credit if a > 0 else None
+                                             for a in amounts))
+        self._info_index.truncate(start)
+        self._info_index.extend(start, (t.info for t in self.transactions[start:]))
+        if self._category_index_revision == self._category_revision.value:
+            self._category_index.truncate(start)
+            self._category_index.extend(start, (t.category for t in self.transactions[start:]))
+
+    @property
+    def debit_transactions(self) -> List[Transaction]:  # money spent/withdrawn
+        return self._transactions_at(self._direction_index.get(Direction.debit))
+
+    @property
+    def credit_transactions(self) -> List[Transaction]:  # money deposited
+        return self._transactions_at(self._direction_index.get(Direction.credit))
+
+    @property
+    def categories(self) -> List[Optional[str]]:
+        return self._get_category_index().keys()
+
+    def positions_of_direction(self, direction: Direction) -> List[int]:
+        return self._direction_index.get(direction)
+
+    def positions_of_category(self, category: Optional[str]) -> List[int]:
+        return self._get_category_index().get(category)
+
+    def positions_of_info(self, info: str) -> List[int]:
+        return self._info_index.get(info)
+
+    def transactions_of_category(self, category: Optional[str]) -> List[Transaction]:
+        return self._transactions_at(self.positions_of_category(category))
+
+    def transactions_of_info(self, info: str) -> List[Transaction]:
+        return self._transactions_at(self.positions_of_info(info))
+
+    def transactions_by_category(self, direction: Optional[Direction] = None) -> Dict[str, List[Transaction]]:
+        """
+        Same as group_transactions_using_category over all, debit or credit transactions, without scanning the
+        whole ledger.
+        """
+        amounts = self.balance_history.amounts
+        groups = {}
+        for category in self.categories:
+            if not category:
+                continue
+            positions = self.positions_of_category(category)
+            if direction is Direction.debit:
+                positions = [i for i in positions if amounts[i] < 0]
+            elif direction is Direction.credit:
+                positions = [i for i in positions if amounts[i] > 0]
+            if positions:
+                groups[category] = positions
+        # keep the order of first appearance like iterating over the transactions does
+        return {category: self._transactions_at(positions)
+                for category, positions in sorted(groups.items(), key=lambda x: x[1][0])}
+
+    def category_codes(self) -> Tuple[np.ndarray, List[Optional[str]]]:
+        index = self._get_category_index()
+        categories = index.keys()
+        codes = np.empty(len(self.transactions), dtype=np.intp)
+        for code, category in enumerate(categories):
+            codes[index.get(category)] = code
+        return codes, categories
+
+    def pivot(self, period: Period = Period.monthly, direction: Optional[Direction] = None) -> CategoryPivot:
+        """
+        Same as `BaseLedger.pivot`, the pivot is kept up to date as transactions are added to the ledger. Categories
+        assigned afterwards are not reflected, create a new pivot after categorising.
+        """
+        pivot = super().pivot(period, direction)
+        self._pivots[pivot] = direction
+        return pivot
+
+    def _get_category_index(self) -> PositionIndex:
+        if self._category_index_revision != self._category_revision.value:
+            self._category_index = PositionIndex()
+            self._category_index.extend(0, (t.category for t in self.transactions))
+            self._category_index_revision = self._category_revision.value
+        return self._category_index
+
+    def _transactions_at(self, positions: List[int]) -> List[Transaction]:
+        transactions = self.transactions
+        return [transactions[i] for i in positions]
+
+    def filtered(self, is_filtered: Callable[[Transaction], bool]) -> "LedgerView":
+        mask = np.fromiter((not is_filtered(t) for t in self.transactions), dtype=bool, count=len(self.transactions))
+        return self.view(mask)
+
+    def view(self, selection: np.ndarray) -> "LedgerView":
+        """
+        Returns a view of the transactions selected by a boolean mask or by positions in ascending order.
+        """
+        selection = np.asarray(selection)
+        positions = np.flatnonzero(selection) if selection.dtype == bool else selection.astype(np.intp)
+        return LedgerView(self, positions)
+
+    def _select(self, positions: slice) -> "LedgerView":
+        return LedgerView(self, np.arange(len(self.transactions))[positions])
+
+
+class LedgerView(BaseLedger):
+    """
+    Transactions of a ledger selected by their positions, nothing is copied and the transaction list and balance
+    history of the view are created on first access. A view is only valid until its ledger changes.
+    """
+
+    def __init__(self, ledger: Ledger, positions: np.ndarray):
+        self.ledger = ledger
+        self.positions = positions
+        self._revision = ledger._revision
+        self._balance_history: Optional[BalanceHistory] = None
+        # transactions at `positions` and the positions and ledger revision they were taken at
+        self._transactions: List[Transaction] = []
+        self._transactions_key: Optional[Tuple[np.ndarray, int]] = None
+
+    @property
+    def transactions(self) -> List[Transaction]:
+        self._check_revision()
+        key = self._transactions_key
+        if key is None or key[0] is not self.positions or key[1] != self.ledger._revision:
+            transactions = self.ledger.transactions
+            self._transactions = [transactions[i] for i in self.positions.tolist()]
+            self._transactions_key = (self.positions, self.ledger._revision)
+        return self._transactions
+
+    def transaction(self, position: int) -> Transaction:
+        self._check_revision()
+        return self.ledger.transactions[int(self.positions[position])]
+
+    @property
+    def balance_history(self) -> BalanceHistory:
+        self._check_revision()
+        if self._balance_history is None:
+            dates = self.ledger._dates
+            self._balance_history = BalanceHistory([dates[i] for i in self.positions.tolist()])
+            self._balance_history.update(0, self.ledger.balance_history.amounts[self.positions])
+        return self._balance_history
+
+    def filtered(self, is_filtered: Callable[[Transaction], bool]) -> "LedgerView":
+        mask = np.fromiter((not is_filtered(t) for t in self.transactions), dtype=bool, count=len(self.positions))
+        return LedgerView(self.ledger, self.positions[mask])
+
+    def _select(self, positions: slice) -> "LedgerView":
+        return LedgerView(self.ledger, self.positions[positions])
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def _check_revision(self):
+        if self._revision != self.ledger._revision:
+            raise ValueError("Ledger has changed since the view was created")
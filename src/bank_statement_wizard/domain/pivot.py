@@ -0,0 +1,145 @@
+from enum import Enum, unique
+from datetime import date
+from typing import List, Optional, Dict, Sequence, TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from .ledger import Transaction
+
+
+__all__ = ["Period", "Aggregation", "CategoryPivot"]
+
+
+@unique
+class Period(str, Enum):
+    weekly = "weekly"
+    monthly = "monthly"
+    yearly = "yearly"
+
+
+@unique
+class Aggregation(str, Enum):
+    sum = "sum"
+    count = "count"
+    mean = "mean"
+    min = "min"
+    max = "max"
+
+
+def _to_period_ordinals(dates: Sequence[date], period: Period) -> np.ndarray:
+    days = np.array(dates, dtype="datetime64[D]")
+    if period is Period.weekly:
+        # weeks start on monday, 1970-01-01 is a thursday
+        return (days.astype(np.int64) + 3) // 7
+    return days.astype("datetime64[M]" if period is Period.monthly else "datetime64[Y]").astype(np.int64)
+
+
+def _period_start(ordinal: int, period: Period) -> date:
+    if period is Period.weekly:
+        return np.datetime64(ordinal * 7 - 3, "D").astype(date)
+    start = np.datetime64(ordinal, "M" if period is Period.monthly else "Y")
+    return start.astype("datetime64[D]").astype(date)
+
+
+class CategoryPivot:
+    """
+    Dense categories x periods matrices of the transaction amounts, e.g. spending per category per month. Periods are
+    contiguous from the first to the last period with transactions and are identified by their start dates. Adding
+    transactions only touches the cells they fall into, the matrices grow when new categories or periods appear.
+    """
+
+    def __init__(self, period: Period = Period.monthly):
+        self.period = period
+        self.categories: List[Optional[str]] = []
+        self._category_codes: Dict[Optional[str], int] = {}
+        self._first_period: int = 0
+        self._sums: np.ndarray = np.zeros((0, 0))
+        self._counts: np.ndarray = np.zeros((0, 0), dtype=np.int64)
+        self._mins: np.ndarray = np.zeros((0, 0))
+        self._maxs: np.ndarray = np.zeros((0, 0))
+
+    @property
+    def periods(self) -> List[date]:
+        return [_period_start(self._first_period + n, self.period) for n in range(self._sums.shape[1])]
+
+    @property
+    def shape(self):
+        return self._sums.shape
+
+    def add(self, categories: Sequence[Optional[str]], dates: Sequence[date], amounts: Sequence[float]):
+        """
+        Aggregates the amounts of the given transactions into their category and period cells.
+        """
+        category_codes: Dict[Optional[str], int] = {}
+        codes = np.fromiter((category_codes.setdefault(c, len(category_codes)) for c in categories), dtype=np.intp,
+                            count=len(categories))
+        self.add_category_codes(codes, list(category_codes), dates, amounts)
+
+    def add_category_codes(self, codes: np.ndarray, categories: Sequence[Optional[str]], dates: Sequence[date],
+                           amounts: Sequence[float]):
+        """
+        Same as `add` with the categories given as positions in `categories`, see `BaseLedger.category_codes`.
+        """
+        if len(amounts) == 0:
+            return
+        mapping = np.array([self._category_codes.setdefault(c, len(self._category_codes)) for c in categories],
+                           dtype=np.intp)
+        codes = mapping[codes]
+        self.categories = list(self._category_codes)
+        ordinals = _to_period_ordinals(dates, self.period)
+        self._reserve(int(ordinals.min()), int(ordinals.max()))
+
+        cells = codes * self._sums.shape[1] + (ordinals - self._first_period)
+        cells, cell_codes = np.unique(cells, return_inverse=True)
+        amounts = np.asarray(amounts, dtype=np.float64)
+        self._sums.flat[cells] += np.bincount(cell_codes, weights=amounts, minlength=len(cells))
+        self._counts.flat[cells] += np.bincount(cell_codes, minlength=len(cells))
+        mins = np.full(len(cells), np.inf)
+        maxs = np.full(len(cells), -np.inf)
+        np.minimum.at(mins, cell_codes, amounts)
+        np.maximum.at(maxs, cell_codes, amounts)
+        self._mins.flat[cells] = np.minimum(self._mins.flat[cells], mins)
+        self._maxs.flat[cells] = np.maximum(self._maxs.flat[cells], maxs)
+
+    def add_transactions(self, transactions: Sequence["Transaction"]):
+        self.add([t.category for t in transactions], [t.date for t in transactions],
+                 [t.amount for t in transactions])
+
+    def values(self, aggregation: Aggregation = Aggregation.sum) -> np.ndarray:
+        """
+        Returns the categories x periods matrix of the aggregation, cells without transactions are 0 for sums and
+        counts and nan otherwise.
+        """
+        if aggregation is Aggregation.sum:
+            return self._sums.copy()
+        if aggregation is Aggregation.count:
+            return self._counts.copy()
+        empty = self._counts == 0
+        if aggregation is Aggregation.mean:
+            return np.divide(self._sums, self._counts, out=np.full(self.shape, np.nan), where=~empty)
+        values = self._mins if aggregation is Aggregation.min else self._maxs
+        return np.where(empty, np.nan, values)
+
+    def to_dict(self, aggregation: Aggregation = Aggregation.sum) -> Dict[Optional[str], Dict[date, float]]:
+        values = self.values(aggregation).tolist()
+        periods = self.periods
+        return {category: dict(zip(periods, row)) for category, row in zip(self.categories, values)}
+
+    def _reserve(self, first_period: int, last_period: int):
+        n_categories = len(self._category_codes)
+        current_categories, current_periods = self._sums.shape
+        if current_periods:
+            first_period = min(first_period, self._first_period)
+            last_period = max(last_period, self._first_period + current_periods - 1)
+        n_periods = last_period - first_period + 1
+        if (n_categories, n_periods) == (current_categories, current_periods):
+            return
+
+        offset = self._first_period - first_period if current_periods else 0
+        for name, fill in (("_sums", 0.0), ("_counts", 0), ("_mins", np.inf), ("_maxs", -np.inf)):
+            current = getattr(self, name)
+            grown = np.full((n_categories, n_periods), fill, dtype=current.dtype)
+            grown[:current_categories, offset:offset + current_periods] = current
+            setattr(self, name, grown)
+        self._first_period = first_period
@@ -0,0 +1,260 @@
+import mmap
+import struct
+from uuid import UUID
+from datetime import date
+from typing import List, Optional, Dict, Tuple, Iterable, Callable, Sequence
+
+import numpy as np
+
+from .date_range import DateRange, Inclusivity
+from .ledger import Transaction, TransactionId, Ledger, BaseLedger, BalanceHistory
+
+__all__ = ["save_ledger_snapshot", "LedgerSnapshot", "SnapshotLedger"]
+
+
+_MAGIC = b"BSWIZLDG"
+_VERSION = 1
+_HEADER = struct.Struct("<8sIQQ")  # magic, version, number of transactions, number of strings
+_HEADER_SIZE = 32
+
+
+def _aligned(offset: int) -> int:
+    return (offset + 7) // 8 * 8
+
+
+def _layout(count: int, number_of_strings: int) -> Dict[str, Tuple[int, np.dtype, Tuple[int, ...]]]:
+    """
+    Offsets, types and shapes of the arrays in a snapshot, following the header in this order.
+    """
+    arrays = [("dates", np.dtype("<i8"), (count,)),  # date ordinals
+              ("amounts", np.dtype("<f8"), (count,)),
+              ("ids", np.dtype("u1"), (count, 16)),
+              ("descriptions", np.dtype("<i4"), (count,)),  # codes in the string table, -1 for None
+              ("infos", np.dtype("<i4"), (count,)),
+              ("categories", np.dtype("<i4"), (count,)),
+              ("string_offsets", np.dtype("<i8"), (number_of_strings + 1,))]
+    layout, offset = {}, _HEADER_SIZE
+    for name, dtype, shape in arrays:
+        offset = _aligned(offset)
+        layout[name] = (offset, dtype, shape)
+        offset += dtype.itemsize * int(np.prod(shape))
+    layout["strings"] = (offset, np.dtype("u1"), ())
+    return layout
+
+
+def save_ledger_snapshot(ledger: Ledger, path: str):
+    """
+    Writes the ledger transactions as fixed layout columnar arrays followed by a table of the strings they use.
+    """
+    transactions = ledger.transactions
+    strings: Dict[str, int] = {}
+
+    def codes(values: Iterable[Optional[str]]) -> np.ndarray:
+        return np.array([-1 if i is None else strings.setdefault(i, len(strings)) for i in values], dtype="<i4")
+
+    columns = {
+        "dates": np.array([t.date.toordinal() for t in transactions], dtype="<i8"),
+        "amounts": np.array([t.amount for t in transactions], dtype="<f8"),
+        "ids": np.frombuffer(b"".join(t.id.bytes for t in transactions), dtype="u1").reshape(-1, 16),
+        "descriptions": codes(t._description for t in transactions),
+        "infos": codes(t._info for t in transactions),
+        "categories": codes(t.category for t in transactions),
+    }
+    encoded = [i.encode("utf-8") for i in strings]
+    columns["string_offsets"] = np.cumsum([0] + [len(i) for i in encoded], dtype="<i8")
+
+    with open(path, "wb") as handle:
+        handle.write(_HEADER.pack(_MAGIC, _VERSION, len(transactions), len(strings)).ljust(_HEADER_SIZE, b"\0"))
+        for name, (offset, dtype, _) in _layout(len(transactions), len(strings)).items():
+            handle.write(b"\0" * (offset - handle.tell()))
+            if name == "strings":
+                handle.write(b"".join(encoded))
+            else:
+                handle.write(np.ascontiguousarray(columns[name], dtype=dtype).tobytes())
+
+
+class LedgerSnapshot:
+    """
+    A ledger snapshot opened through mmap. Columns are read in place, transactions are only created for the rows
+    that are asked for. The column arrays are views of the map and must not be referenced once the snapshot is
+    closed, `close` raises a ValueError while they are, copy the arrays to keep them longer.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as handle:
+            self._mmap = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count, number_of_strings = _HEADER.unpack_from(self._mmap)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"{path} is not a ledger snapshot of version {_VERSION}")
+
+        self._count = count
+        self._number_of_strings = number_of_strings
+        self._strings_offset = self._map_arrays()
+        self._decoded_strings: Dict[int, str] = {}
+
+    def _map_arrays(self) -> int:
+        layout = _layout(self._count, self._number_of_strings)
+        for name, (offset, dtype, shape) in layout.items():
+            if name != "strings":
+                array = np.frombuffer(self._mmap, dtype=dtype, count=int(np.prod(shape)), offset=offset)
+                setattr(self, name, array.reshape(shape))
+        return layout["strings"][0]
+
+    @property
+    def closed(self) -> bool:
+        return self._mmap.closed
+
+    def __len__(self) -> int:
+        return self._count
+
+    def string(self, code: int) -> Optional[str]:
+        if code < 0:
+            return None
+        if code not in self._decoded_strings:
+            start, end = self.string_offsets[code:code + 2] + self._strings_offset
+            self._decoded_strings[code] = self._mmap[start:end].decode("utf-8")
+        return self._decoded_strings[code]
+
+    def strings(self, codes: np.ndarray, missing: Optional[str] = None) -> np.ndarray:
+        """
+        Decodes a column of string codes into an object array, every distinct string is decoded once.
+        """
+        table = np.empty(self._number_of_strings + 1, dtype=object)
+        table[:-1] = [self.string(i) for i in range(self._number_of_strings)]
+        table[-1] = missing  # code -1
+        return table[codes]
+
+    def transaction_ids(self, positions: Iterable[int]) -> List[TransactionId]:
+        ids = self.ids
+        return [TransactionId(UUID(bytes=ids[i].tobytes())) for i in positions]
+
+    def transaction(self, position: int) -> Transaction:
+        transaction = Transaction(
+            amount=float(self.amounts[position]),
+            date=date.fromordinal(int(self.dates[position])),
+            description=self.string(int(self.descriptions[position])),
+            info=self.string(int(self.infos[position])),
+            category=self.string(int(self.categories[position])),
+        )
+        transaction._id = UUID(bytes=self.ids[position].tobytes())
+        return transaction
+
+    def transactions(self, positions: Optional[Iterable[int]] = None) -> List[Transaction]:
+        positions = range(self._count) if positions is None else positions
+        return [self.transaction(i) for i in positions]
+
+    def date_range_positions(self, date_range: DateRange) -> Tuple[int, int]:
+        start = np.searchsorted(self.dates, date_range.start.date.toordinal(),
+                                "left" if date_range.start.inclusivity is Inclusivity.closed else "right")
+        end = np.searchsorted(self.dates, date_range.end.date.toordinal(),
+                              "right" if date_range.end.inclusivity is Inclusivity.closed else "left")
+        return int(start), int(max(start, end))
+
+    def to_ledger(self, date_range: Optional[DateRange] = None) -> Ledger:
+        start, end = (0, self._count) if date_range is None else self.date_range_positions(date_range)
+        return Ledger().add_transactions(self.transactions(range(start, end)))
+
+    def ledger(self, date_range: Optional[DateRange] = None) -> "SnapshotLedger":
+        """
+        Same as `to_ledger` without creating the transactions, the returned ledger reads the snapshot columns.
+        """
+        start, end = (0, self._count) if date_range is None else self.date_range_positions(date_range)
+        return SnapshotLedger(self, np.arange(start, end))
+
+    def close(self):
+        if self.closed:
+            return
+        for name in _layout(0, 0):
+            self.__dict__.pop(name, None)  # arrays must be released before the map is closed
+        try:
+            self._mmap.close()
+        except BufferError:
+            self._map_arrays()
+            raise ValueError(f"arrays of {self.path} are still referenced, copy them to keep them after closing") \
+                from None
+
+    def __enter__(self) -> "LedgerSnapshot":
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+
+class SnapshotLedger(BaseLedger):
+    """
+    Transactions of a snapshot selected by their positions. Balances, categories and table columns are read from the
+    snapshot columns, transactions are only created for the positions passed to `transaction` and for all of them on
+    first access to `transactions`. A snapshot ledger is only valid until its snapshot is closed.
+    """
+
+    def __init__(self, snapshot: LedgerSnapshot, positions: np.ndarray):
+        self.snapshot = snapshot
+        self.positions = positions
+        self._transactions: Optional[List[Transaction]] = None
+        self._balance_history: Optional[BalanceHistory] = None
+
+    @property
+    def transactions(self) -> List[Transaction]:
+        self._check_open()
+        if self._transactions is None:
+            self._transactions = self.snapshot.transactions(self.positions.tolist())
+        return self._transactions
+
+    def transaction(self, position: int) -> Transaction:
+        if self._transactions is not None:
+            return self._transactions[position]
+        self._check_open()
+        return self.snapshot.transaction(int(self.positions[position]))
+
+    @property
+    def transaction_ids(self) -> List[TransactionId]:
+        self._check_open()
+        return self.snapshot.transaction_ids(self.positions.tolist())
+
+    @property
+    def balance_history(self) -> BalanceHistory:
+        self._check_open()
+        if self._balance_history is None:
+            dates = [date.fromordinal(i) for i in self.snapshot.dates[self.positions].tolist()]
+            self._balance_history = BalanceHistory(dates)
+            self._balance_history.update(0, self.snapshot.amounts[self.positions])
+        return self._balance_history
+
+    def columns(self) -> Dict[str, Sequence]:
+        self._check_open()
+        snapshot = self.snapshot
+        return {
+            "date": self.balance_history.dates,
+            "description": snapshot.strings(snapshot.descriptions[self.positions], missing="None"),
+            "amount": self.balance_history.amounts,
+            "info": snapshot.strings(snapshot.infos[self.positions], missing="None"),
+            "category": snapshot.strings(snapshot.categories[self.positions]),
+        }
+
+    def category_codes(self) -> Tuple[np.ndarray, List[Optional[str]]]:
+        self._check_open()
+        category_codes, codes = np.unique(self.snapshot.categories[self.positions], return_inverse=True)
+        return codes.astype(np.intp), [self.snapshot.string(i) for i in category_codes.tolist()]
+
+    def filtered(self, is_filtered: Callable[[Transaction], bool]) -> "SnapshotLedger":
+        mask = np.fromiter((not is_filtered(t) for t in self.transactions), dtype=bool, count=len(self.positions))
+        return self.view(mask)
+
+    def view(self, selection: np.ndarray) -> "SnapshotLedger":
+        """
+        Returns the transactions selected by a boolean mask or by positions in ascending order.
+        """
+        selection = np.asarray(selection)
+        positions = np.flatnonzero(selection) if selection.dtype == bool else selection.astype(np.intp)
+        return SnapshotLedger(self.snapshot, self.positions[positions])
+
+    def _select(self, positions: slice) -> "SnapshotLedger":
+        return SnapshotLedger(self.snapshot, self.positions[positions])
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    def _check_open(self):
+        if self.snapshot.closed:
+            raise ValueError(f"{self.snapshot.path} has been closed")
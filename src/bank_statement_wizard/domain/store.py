@@ -0,0 +1,119 @@
+import sqlite3
+from uuid import UUID
+from datetime import date
+from typing import List, Optional, Iterable, Tuple, Any
+
+from .date_range import DateRange, Inclusivity
+from .ledger import Transaction, Ledger
+from .utility import iter_batches
+
+__all__ = ["SqliteLedgerStore"]
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS transactions (
+    sequence INTEGER PRIMARY KEY AUTOINCREMENT,
+    id TEXT NOT NULL UNIQUE,
+    date TEXT NOT NULL,
+    amount REAL NOT NULL,
+    description TEXT,
+    info TEXT,
+    category TEXT
+);
+CREATE INDEX IF NOT EXISTS transactions_date ON transactions (date, sequence);
+CREATE INDEX IF NOT EXISTS transactions_category ON transactions (category);
+CREATE INDEX IF NOT EXISTS transactions_amount ON transactions (amount);
+"""
+
+_COLUMNS = "id, date, amount, description, info, category"
+
+
+def _to_row(transaction: Transaction) -> Tuple[Any, ...]:
+    return (transaction.id.hex, transaction.date.isoformat(), transaction.amount, transaction._description,
+            transaction._info, transaction.category)
+
+
+def _from_row(row: Tuple[Any, ...]) -> Transaction:
+    _id, _date, amount, description, info, category = row
+    transaction = Transaction(amount=amount, date=date.fromisoformat(_date), description=description, info=info,
+                              category=category)
+    transaction._id = UUID(hex=_id)
+    return transaction
+
+
+class SqliteLedgerStore:
+    """
+    Transactions persisted in an SQLite database, unique by their id. Transactions are returned in date order and
+    in insertion order within a date, the same order a Ledger keeps them in.
+    """
+
+    def __init__(self, path: str, batch_size: int = 10000):
+        self.path = path
+        self.batch_size = batch_size
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(_SCHEMA)
+
+    def add_transactions(self, transactions: Iterable[Transaction]) -> "SqliteLedgerStore":
+        with self.connection:
+            for batch in iter_batches(transactions, self.batch_size):
+                self.connection.executemany(
+                    f"INSERT OR IGNORE INTO transactions ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?)",
+                    [_to_row(t) for t in batch])
+        return self
+
+    def update_categories(self, transactions: Iterable[Transaction]) -> "SqliteLedgerStore":
+        with self.connection:
+            for batch in iter_batches(transactions, self.batch_size):
+                self.connection.executemany("UPDATE transactions SET category = ? WHERE id = ?",
+                                            [(t.category, t.id.hex) for t in batch])
+        return self
+
+    def query(
+        self,
+        date_range: Optional[DateRange] = None,
+        category: Optional[str] = None,
+        min_amount: Optional[float] = None,
+        max_amount: Optional[float] = None
+    ) -> List[Transaction]:
+        conditions, parameters = [], []
+        if date_range is not None:
+            conditions.append("date >= ?" if date_range.start.inclusivity is Inclusivity.closed else "date > ?")
+            conditions.append("date <= ?" if date_range.end.inclusivity is Inclusivity.closed else "date < ?")
+            parameters += [date_range.start.date.isoformat(), date_range.end.date.isoformat()]
+        if category is not None:
+            conditions.append("category = ?")
+            parameters.append(category)
+        if min_amount is not None:
+            conditions.append("amount >= ?")
+            parameters.append(min_amount)
+        if max_amount is not None:
+            conditions.append("amount <= ?")
+            parameters.append(max_amount)
+
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        cursor = self.connection.execute(
+            f"SELECT {_COLUMNS} FROM transactions {where} ORDER BY date, sequence", parameters)
+        return [_from_row(i) for i in cursor]
+
+    def categories(self) -> List[Optional[str]]:
+        return [i[0] for i in self.connection.execute("SELECT DISTINCT category FROM transactions")]
+
+    def load_ledger(self, **query) -> Ledger:
+        """
+        Loads the transactions matching the query, see `query`, into a new ledger.
+        """
+        return Ledger().add_transactions(self.query(**query))
+
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM transactions").fetchone()[0]
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self) -> "SqliteLedgerStore":
+        return self
+
+    def __exit__(self, *_):
+        self.close()
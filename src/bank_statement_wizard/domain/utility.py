@@ -1,12 +1,15 @@
 from collections import OrderedDict, defaultdict
-from typing import List, Dict, Callable, Optional, Tuple, Any, Union
+from typing import List, Dict, Callable, Optional, Tuple, Any, Union, Iterable, Iterator, TypeVar
 import csv
 import ast
 import json
 import re
 
 __all__ = ["check_date", "replace_non_alphanumeric", "remove_consecutive_chars", "filter_non_alphanumeric",
-           "load_json_file", "load_category_data"]
+           "load_json_file", "load_category_data", "iter_batches"]
+
+
+T = TypeVar("T")
 
 
 def check_date(date: str):
@@ -39,3 +42,16 @@ def load_category_data(path_to_category_data: str):
     for category, keywords_list in data.items():
         data[category] = [filter_non_alphanumeric(i) for i in keywords_list]
     return data
+
+
+def iter_batches(items: Iterable[T], batch_size: int) -> Iterator[List[T]]:
+    if batch_size < 1:
+        raise ValueError(f"Invalid batch size {batch_size}")
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
@@ -0,0 +1,126 @@
+import os
+import pickle
+import hashlib
+import tempfile
+from datetime import date
+from typing import Callable, List, Optional, Tuple
+
+from ..domain.ledger import Transaction
+from ..logging import get_logger
+
+__all__ = ["PARSER_VERSION", "StatementCache", "default_cache_dir"]
+
+
+# bump whenever a change in parsing changes the transactions produced for the same statement
+PARSER_VERSION = 1
+
+logger = get_logger()
+
+
+def default_cache_dir() -> str:
+    cache_home = os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache"))
+    return os.path.join(cache_home, "bank_statement_wizard")
+
+
+def _file_digest(path: str, block_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for block in iter(lambda: handle.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _to_record(transaction: Transaction) -> Tuple[float, int, Optional[str], Optional[str]]:
+    return transaction._amount, transaction.date.toordinal(), transaction._description, transaction._info
+
+
+def _from_record(record: Tuple[float, int, Optional[str], Optional[str]]) -> Transaction:
+    amount, ordinal, description, info = record
+    return Transaction(amount=amount, date=date.fromordinal(ordinal), description=description, info=info)
+
+
+class StatementCache:
+    """
+    Parsed statements stored on disk, keyed by the statement content, statement type and parser version so any
+    edit of a statement misses the cache. Least recently used entries are removed once the cache grows over
+    `max_size_in_bytes`.
+    """
+    _suffix = ".statement"
+
+    def __init__(self, cache_dir: Optional[str] = None, max_size_in_bytes: int = 256 * 1024 * 1024):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_size_in_bytes = max_size_in_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def key(self, path_to_statement: str, statement_type: str) -> str:
+        return f"{_file_digest(path_to_statement)}-{statement_type}-v{PARSER_VERSION}"
+
+    def get(self, key: str) -> Optional[List[Transaction]]:
+        path = self._entry_path(key)
+        try:
+            with open(path, "rb") as handle:
+                records = pickle.load(handle)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Removing unreadable statement cache entry {path}: {e}")
+            self._remove(path)
+            return None
+        os.utime(path)  # mark as recently used
+        return [_from_record(i) for i in records]
+
+    def put(self, key: str, transactions: List[Transaction]):
+        handle, temporary_path = tempfile.mkstemp(dir=self.cache_dir)
+        try:
+            with os.fdopen(handle, "wb") as output:
+                pickle.dump([_to_record(i) for i in transactions], output, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary_path, self._entry_path(key))
+        except Exception:
+            self._remove(temporary_path)
+            raise
+        self._evict()
+
+    def load(self, path_to_statement: str, statement_type: str,
+             loader: Callable[[str], List[Transaction]]) -> List[Transaction]:
+        key = self.key(path_to_statement, statement_type)
+        transactions = self.get(key)
+        if transactions is None:
+            transactions = loader(path_to_statement)
+            self.put(key, transactions)
+        return transactions
+
+    def clear(self):
+        for path, _, _ in self._entries():
+            self._remove(path)
+
+    @property
+    def size_in_bytes(self) -> int:
+        return sum(size for _, _, size in self._entries())
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + self._suffix)
+
+    def _entries(self) -> List[Tuple[str, float, int]]:
+        entries = []
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if entry.is_file() and entry.name.endswith(self._suffix):
+                    stat = entry.stat()
+                    entries.append((entry.path, stat.st_mtime, stat.st_size))
+        return entries
+
+    def _evict(self):
+        entries = sorted(self._entries(), key=lambda x: x[1])
+        total_size = sum(size for _, _, size in entries)
+        for path, _, size in entries:
+            if total_size <= self.max_size_in_bytes:
+                break
+            self._remove(path)
+            total_size -= size
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
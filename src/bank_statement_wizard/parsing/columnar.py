@@ -0,0 +1,160 @@
+from array import array
+from datetime import date
+from dataclasses import dataclass, field
+from typing import Dict, List, Any, Iterable, Optional, Union
+
+import numpy as np
+
+__all__ = ["CategoricalColumn", "ColumnBuilder", "Column", "build_columns", "concatenate_columns"]
+
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+_MISSING_DATE = np.iinfo(np.int64).min  # NaT in datetime64
+
+
+@dataclass
+class CategoricalColumn:
+    codes: np.ndarray
+    categories: List[str] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __getitem__(self, index: int) -> Optional[str]:
+        code = self.codes[index]
+        return self.categories[code] if code >= 0 else None
+
+    def values(self) -> List[Optional[str]]:
+        return [self.categories[c] if c >= 0 else None for c in self.codes.tolist()]
+
+
+Column = Union[np.ndarray, CategoricalColumn]
+
+
+class ColumnBuilder:
+    """
+    Accumulates parsed values of one column into a typed buffer. The column kind is decided by the first
+    value that is not None: dates go to datetime64[D], numbers to float64 and strings to categorical codes.
+    Missing values are stored as NaT, NaN and -1 respectively.
+    """
+
+    def __init__(self):
+        self._kind: Optional[type] = None
+        self._pending_missing: int = 0
+        self._buffer: Optional[array] = None
+        self._category_codes: Dict[str, int] = {}
+
+    def append(self, value: Any):
+        if value is None:
+            self.append_missing()
+            return
+
+        if self._kind is None:
+            self._start(value)
+
+        if self._kind is date:
+            self._buffer.append(value.toordinal() - _EPOCH_ORDINAL)
+        elif self._kind is float:
+            self._buffer.append(value)
+        else:
+            code = self._category_codes.get(value)
+            if code is None:
+                code = self._category_codes[value] = len(self._category_codes)
+            self._buffer.append(code)
+
+    def append_missing(self, count: int = 1):
+        if self._kind is None:
+            self._pending_missing += count
+        else:
+            self._buffer.extend([self._missing()] * count)
+
+    def build(self) -> Column:
+        if self._kind is None:
+            return np.full(self._pending_missing, np.nan, dtype=np.float64)
+        if self._kind is date:
+            return np.frombuffer(self._buffer, dtype=np.int64).astype("datetime64[D]")
+        if self._kind is float:
+            return np.frombuffer(self._buffer, dtype=np.float64).copy()
+        return CategoricalColumn(codes=np.frombuffer(self._buffer, dtype=np.int32).copy(),
+                                 categories=list(self._category_codes))
+
+    def _start(self, value: Any):
+        if isinstance(value, date):
+            self._kind, typecode = date, "q"
+        elif isinstance(value, (int, float)):
+            self._kind, typecode = float, "d"
+        elif isinstance(value, str):
+            self._kind, typecode = str, "i"
+        else:
+            raise ValueError(f"Cannot store values of type {type(value).__name__} in a column")
+        self._buffer = array(typecode, [self._missing()] * self._pending_missing)
+
+    def _missing(self):
+        if self._kind is date:
+            return _MISSING_DATE
+        if self._kind is float:
+            return float("nan")
+        return -1
+
+
+def build_columns(parsed_lines: Iterable[Dict[str, Any]]) -> Dict[str, Column]:
+    """
+    Builds one column per key of the parsed lines. Lines without some of the keys, e.g. short lines parsed by the
+    fallback line parser, get missing values in those columns so all the columns have one value per line.
+    """
+    builders: Dict[str, ColumnBuilder] = {}
+    number_of_lines = 0
+    for parsed_line in parsed_lines:
+        for key, value in parsed_line.items():
+            builder = builders.get(key)
+            if builder is None:
+                builder = builders[key] = ColumnBuilder()
+                builder.append_missing(number_of_lines)
+            builder.append(value)
+        number_of_lines += 1
+        if len(parsed_line) < len(builders):
+            for key, builder in builders.items():
+                if key not in parsed_line:
+                    builder.append_missing()
+    return {key: builder.build() for key, builder in builders.items()}
+
+
+def _is_all_missing(column: Column) -> bool:
+    # columns without any value are built as NaN arrays since their kind is unknown
+    return isinstance(column, np.ndarray) and column.dtype == np.float64 and bool(np.isnan(column).all())
+
+
+def _concatenate_column(parts: List[Column]) -> Column:
+    kinds = [i for i in parts if not _is_all_missing(i)]
+    if not kinds:
+        return np.concatenate(parts)
+
+    if isinstance(kinds[0], CategoricalColumn):
+        category_codes: Dict[str, int] = {}
+        codes = []
+        for part in parts:
+            if isinstance(part, CategoricalColumn):
+                remap = np.array([category_codes.setdefault(c, len(category_codes)) for c in part.categories] + [-1],
+                                 dtype=np.int32)
+                codes.append(remap[part.codes])  # -1 picks the trailing -1, missing stays missing
+            else:
+                codes.append(np.full(len(part), -1, dtype=np.int32))
+        return CategoricalColumn(codes=np.concatenate(codes), categories=list(category_codes))
+
+    dtype = kinds[0].dtype
+    arrays = []
+    for part in parts:
+        if part.dtype != dtype:
+            part = np.full(len(part), None if dtype.kind == "M" else np.nan, dtype=dtype)
+        arrays.append(part)
+    return np.concatenate(arrays)
+
+
+def concatenate_columns(parts: Iterable[Dict[str, Column]]) -> Dict[str, Column]:
+    parts = [i for i in parts if i]
+    keys = list(dict.fromkeys(key for part in parts for key in part))
+    lengths = [len(next(iter(part.values()))) for part in parts]
+    # a column missing from a part has no value in any of its lines
+    return {key: _concatenate_column([part[key] if key in part else np.full(length, np.nan)
+                                      for part, length in zip(parts, lengths)])
+            for key in keys}
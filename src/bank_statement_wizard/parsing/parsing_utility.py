@@ -1,12 +1,25 @@
+import io
+import os
+import mmap
+import locale
+from itertools import chain
 from datetime import date, datetime
+from functools import lru_cache, partial
 from collections import OrderedDict
-from typing import Dict, Callable, TextIO, Any, List, Optional
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Callable, TextIO, Any, List, Optional, Iterator, Union, Iterable, Tuple
 
+from .columnar import Column, build_columns, concatenate_columns
 
-__all__ = ["get_line_parser_from_ordered_dict", "parse_csv_using_schema", "load_lines", "optional_str_to_float",
+
+__all__ = ["get_line_parser_from_ordered_dict", "compile_line_parser", "iter_csv_using_schema",
+           "parse_csv_using_schema", "load_lines", "split_file_into_line_aligned_ranges", "optional_str_to_float",
            "get_date_parser", "to_stripped_string", "default_delimiter", "default_comment_char"]
 
 
+Schema = Dict[str, Any]
+
+
 def get_line_parser_from_ordered_dict(field_name_to_column_parser: OrderedDict):
 
     def _line_parser(line_tokens: List[str]) -> Dict[str, Any]:
@@ -18,29 +31,134 @@ def get_line_parser_from_ordered_dict(field_name_to_column_parser: OrderedDict):
     return _line_parser
 
 
-def parse_csv_using_schema(path_to_file: str, schema: Dict, output_data_type: str = "list"):
-    data = [] if output_data_type == "list" else {}
-
+def compile_line_parser(field_name_to_column_parser: OrderedDict,
+                        output_type: Union[str, Callable[..., Any]] = "dict") -> Callable[[List[str]], Any]:
+    """
+    Generates a line parser specialised for the given columns: tokens are read by position and the known column
+    parsers are inlined, so there is no per-line iteration over the schema. The parser returns a dict like
+    get_line_parser_from_ordered_dict, a tuple, or the result of calling `output_type` with the parsed values in
+    column order, e.g. a function creating a Transaction.
+    """
+    field_names = list(field_name_to_column_parser)
+    namespace: Dict[str, Any] = {"_fallback": get_line_parser_from_ordered_dict(field_name_to_column_parser)}
+    values = []
+    for position, (field_name, column_parser) in enumerate(field_name_to_column_parser.items()):
+        template = _INLINE_COLUMN_PARSERS.get(column_parser)
+        if template is None:
+            namespace[f"_column_parser_{position}"] = column_parser
+            template = f"_column_parser_{position}({{}})"
+        values.append(template.format(f"line_tokens[{position}]"))
+
+    short_line = f"raise ValueError(f'Expected {len(field_names)} columns, got {{len(line_tokens)}}')"
+    if output_type == "dict":
+        output = "{" + ", ".join(f"{name!r}: {value}" for name, value in zip(field_names, values)) + "}"
+        short_line = "return _fallback(line_tokens)"
+    elif output_type == "tuple":
+        output = "(" + "".join(f"{value}, " for value in values) + ")"
+    elif callable(output_type):
+        namespace["_output_type"] = output_type
+        output = "_output_type(" + ", ".join(values) + ")"
+    else:
+        raise ValueError(f"Invalid output type {output_type}")
+
+    source = "\n".join([
+        "def _compiled_line_parser(line_tokens):",
+        f"    if len(line_tokens) < {len(field_names)}:",
+        f"        {short_line}",
+        f"    return {output}",
+    ])
+    exec(compile(source, f"<line parser for {', '.join(field_names)}>", "exec"), namespace)
+    return namespace["_compiled_line_parser"]
+
+
+def iter_csv_using_schema(path_to_file: str, schema: Schema) -> Iterator[Dict[str, Any]]:
     with open(path_to_file, "r") as handle_to_file:
-        for line in load_lines(handle_to_file):
-            if schema["is_ignore_line"](line):
-                continue
-
-            tokens = line.strip().split(schema["delimiter"])
-            if len(tokens) == 0:
-                continue
-
-            parsed_line = schema["line_parser"](tokens)
-            if output_data_type == "list":
-                data.append(parsed_line)
-            elif output_data_type == "dict":
-                for key, value in parsed_line:
-                    if key not in data:
-                        data[key] = []
-                    data[key].append(value)
-            else:
-                raise ValueError(f"Invalid data type {output_data_type}")
-    return data
+        yield from _iter_lines_using_schema(load_lines(handle_to_file), schema)
+
+
+def _iter_lines_using_schema(lines: Iterable[str], schema: Schema) -> Iterator[Dict[str, Any]]:
+    for line in lines:
+        if schema["is_ignore_line"](line):
+            continue
+
+        tokens = line.strip().split(schema["delimiter"])
+        if len(tokens) == 0:
+            continue
+
+        yield schema["line_parser"](tokens)
+
+
+def _collect(parsed_lines: Iterable[Dict[str, Any]], output_data_type: str
+             ) -> Union[List[Dict[str, Any]], Dict[str, Column]]:
+    if output_data_type == "list":
+        return list(parsed_lines)
+    elif output_data_type == "dict":
+        return build_columns(parsed_lines)
+    raise ValueError(f"Invalid data type {output_data_type}")
+
+
+def parse_csv_using_schema(
+    path_to_file: str,
+    schema: Union[Schema, Callable[[], Schema]],
+    output_data_type: str = "list",
+    jobs: int = 1
+) -> Union[List[Dict[str, Any]], Dict[str, Column]]:
+    """
+    With jobs > 1 the file is memory mapped and split into newline aligned byte ranges which are parsed in worker
+    processes, results are concatenated in file order. Schemas hold lambdas which cannot be sent to the workers, so
+    in that case `schema` has to be a module level function returning the schema, e.g. a statement schema getter.
+    """
+    if jobs <= 1:
+        _schema = schema() if callable(schema) else schema
+        return _collect(iter_csv_using_schema(path_to_file, _schema), output_data_type)
+
+    if not callable(schema):
+        raise ValueError("Parsing in parallel requires a function returning the schema")
+    if output_data_type not in ("list", "dict"):
+        raise ValueError(f"Invalid data type {output_data_type}")
+
+    byte_ranges = split_file_into_line_aligned_ranges(path_to_file, jobs)
+    if len(byte_ranges) <= 1:
+        return _collect(iter_csv_using_schema(path_to_file, schema()), output_data_type)
+
+    parse_range = partial(_parse_byte_range_using_schema, path_to_file, schema, output_data_type)
+    with ProcessPoolExecutor(max_workers=len(byte_ranges)) as executor:
+        parsed_ranges = list(executor.map(parse_range, byte_ranges))
+
+    if output_data_type == "list":
+        return list(chain.from_iterable(parsed_ranges))
+    return concatenate_columns(parsed_ranges)
+
+
+def split_file_into_line_aligned_ranges(path_to_file: str, number_of_ranges: int) -> List[Tuple[int, int]]:
+    size = os.path.getsize(path_to_file)
+    if size == 0:
+        return []
+
+    ranges, start = [], 0
+    with open(path_to_file, "rb") as handle_to_file, \
+            mmap.mmap(handle_to_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped_file:
+        for i in range(1, number_of_ranges):
+            end = mapped_file.find(b"\n", max(start, size * i // number_of_ranges))
+            if end < 0:
+                break
+            end += 1
+            if end > start:
+                ranges.append((start, end))
+                start = end
+    if start < size:
+        ranges.append((start, size))
+    return ranges
+
+
+def _parse_byte_range_using_schema(path_to_file: str, get_schema: Callable[[], Schema], output_data_type: str,
+                                   byte_range: Tuple[int, int]) -> Union[List[Dict[str, Any]], Dict[str, Column]]:
+    start, end = byte_range
+    with open(path_to_file, "rb") as handle_to_file, \
+            mmap.mmap(handle_to_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped_file:
+        # decode the same way as open(path_to_file, "r") does, i.e. locale encoding and universal newlines
+        lines = io.TextIOWrapper(io.BytesIO(mapped_file[start:end]), encoding=locale.getpreferredencoding(False))
+        return _collect(_iter_lines_using_schema(lines, get_schema()), output_data_type)
 
 
 def load_lines(file_handle: TextIO):
@@ -54,9 +172,59 @@ def optional_str_to_float(data: Optional[str]):
     return None
 
 
-def get_date_parser(date_format: str) -> Callable[[str], date]:
-    def _date_parser(date_value: str) -> date:
+_FIXED_WIDTH_DATE_DIRECTIVES = {"%d": ("day", 2), "%m": ("month", 2), "%Y": ("year", 4)}
+
+
+def _get_fixed_width_date_layout(date_format: str) -> Optional[Dict[str, Any]]:
+    """
+    Returns the slices of day, month and year and the separator positions for formats like "%d/%m/%Y" or
+    "%Y-%m-%d", i.e. zero padded day, month and year separated by single characters, None for any other format.
+    """
+    slices, separators, position, index = {}, [], 0, 0
+    while index < len(date_format):
+        directive = date_format[index:index + 2]
+        if directive in _FIXED_WIDTH_DATE_DIRECTIVES:
+            name, width = _FIXED_WIDTH_DATE_DIRECTIVES[directive]
+            if name in slices:
+                return None
+            slices[name] = slice(position, position + width)
+            position += width
+            index += 2
+        elif date_format[index] == "%":
+            return None
+        else:
+            separators.append((position, date_format[index]))
+            position += 1
+            index += 1
+
+    if len(slices) != len(_FIXED_WIDTH_DATE_DIRECTIVES):
+        return None
+    return {"slices": slices, "separators": separators, "width": position}
+
+
+def get_date_parser(date_format: str, cache_size: Optional[int] = 4096) -> Callable[[str], date]:
+    layout = _get_fixed_width_date_layout(date_format)
+
+    def _strptime_date_parser(date_value: str) -> date:
         return datetime.strptime(date_value, date_format).date()
+
+    if layout is None:
+        _date_parser = _strptime_date_parser
+    else:
+        day, month, year = (layout["slices"][i] for i in ("day", "month", "year"))
+        separators, width = layout["separators"], layout["width"]
+
+        def _date_parser(date_value: str) -> date:
+            if len(date_value) != width or any(date_value[i] != c for i, c in separators):
+                return _strptime_date_parser(date_value)
+            _day, _month, _year = date_value[day], date_value[month], date_value[year]
+            if not (_day.isdigit() and _month.isdigit() and _year.isdigit()):
+                return _strptime_date_parser(date_value)
+            return date(int(_year), int(_month), int(_day))
+
+    if cache_size:
+        # statements repeat the same few hundred dates, parsed dates are immutable so they can be shared
+        _date_parser = lru_cache(maxsize=cache_size)(_date_parser)
     return _date_parser
 
 
@@ -70,3 +238,10 @@ def default_comment_char():
 
 def default_delimiter():
     return ","
+
+
+# source templates of column parsers that compile_line_parser inlines, {0} is the token
+_INLINE_COLUMN_PARSERS = {
+    to_stripped_string: "{0}.strip()",
+    optional_str_to_float: "(float({0}) if {0} else None)",
+}
@@ -1,8 +1,15 @@
 from enum import Enum
-from typing import Callable, List
+from itertools import chain
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Iterator, Sequence, Optional, Union
 
+from ..domain.ledger import Transaction
+from .cache import StatementCache
 from .lloyds_bank_uk import load_transactions_from_lloyds_bank_uk_credit_card_statement
 from .lloyds_bank_uk import load_transactions_from_lloyds_bank_uk_current_account_statement
+from .lloyds_bank_uk import iter_transactions_from_lloyds_bank_uk_credit_card_statement
+from .lloyds_bank_uk import iter_transactions_from_lloyds_bank_uk_current_account_statement
 
 
 class SupportedStatementTypes(Enum):
@@ -24,3 +31,62 @@ def get_loader(statement_type: str) -> Callable:
     elif statement_type == SupportedStatementTypes.LloydsBankUKCreditCardStatement.value:
         return load_transactions_from_lloyds_bank_uk_credit_card_statement
     raise ValueError("{} is not a valid statement type".format(statement_type))
+
+
+def get_iterator(statement_type: str) -> Callable[[str], Iterator[Transaction]]:
+    if statement_type == SupportedStatementTypes.LloydsBankUKCurrentAccountStatement.value:
+        return iter_transactions_from_lloyds_bank_uk_current_account_statement
+    elif statement_type == SupportedStatementTypes.LloydsBankUKCreditCardStatement.value:
+        return iter_transactions_from_lloyds_bank_uk_credit_card_statement
+    raise ValueError("{} is not a valid statement type".format(statement_type))
+
+
+def iter_transactions_from_statement(path_to_statement: str, statement_type: str) -> Iterator[Transaction]:
+    return get_iterator(statement_type)(path_to_statement)
+
+
+def get_cached_loader(statement_type: str, cache: StatementCache) -> Callable[[str], List[Transaction]]:
+    return partial(cache.load, statement_type=statement_type, loader=get_loader(statement_type))
+
+
+def load_transactions_from_statements(
+    paths_to_statements: Sequence[str],
+    statement_type: str,
+    jobs: int = 1,
+    cache: Optional[StatementCache] = None
+) -> List[Transaction]:
+    """
+    Loads the statements in a pool of `jobs` worker processes, transactions are returned in the order of the given
+    statements so the result does not depend on the number of jobs. A single statement is split into byte ranges
+    which are parsed in parallel instead. Statements found in the cache are not parsed at all.
+    """
+    if cache is None:
+        return _load_transactions_from_statements(paths_to_statements, statement_type, jobs)
+
+    keys = [cache.key(i, statement_type) for i in paths_to_statements]
+    loaded = [cache.get(i) for i in keys]
+    missing = [n for n, i in enumerate(loaded) if i is None]
+    if missing:
+        parsed = _load_transactions_from_statements([paths_to_statements[n] for n in missing], statement_type, jobs,
+                                                    flatten=False)
+        for n, transactions in zip(missing, parsed):
+            cache.put(keys[n], transactions)
+            loaded[n] = transactions
+    return list(chain.from_iterable(loaded))
+
+
+def _load_transactions_from_statements(
+    paths_to_statements: Sequence[str],
+    statement_type: str,
+    jobs: int,
+    flatten: bool = True
+) -> Union[List[Transaction], List[List[Transaction]]]:
+    loader = get_loader(statement_type)
+    if len(paths_to_statements) == 1:
+        loaded = [loader(paths_to_statements[0], jobs=jobs)]
+    elif jobs <= 1:
+        loaded = list(map(loader, paths_to_statements))
+    else:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(paths_to_statements))) as executor:
+            loaded = list(executor.map(loader, paths_to_statements))
+    return list(chain.from_iterable(loaded)) if flatten else loaded
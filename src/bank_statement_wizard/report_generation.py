@@ -10,6 +10,7 @@ from reportlab.graphics.shapes import Drawing
 from reportlab.graphics.charts.piecharts import Pie, Rect
 
 from .domain.ledger import Ledger
+from .domain.analysis import CategoryStats
 
 
 def check_font(font: str):
@@ -41,7 +42,7 @@ class StatementReportGenerator:
         statement_type: str,
         statement_date: str,
         ledger: Ledger,
-        expense_stats: Dict[str, Tuple]
+        expense_stats: Optional[Dict[str, CategoryStats]]
     ):
         self._add_info_table(statement_type, statement_date)
         self._add_balance_table(ledger)
@@ -82,11 +83,12 @@ class StatementReportGenerator:
                                                 ("FONTNAME", (0, 1), (-1, -1), self.font)]))
         self.report_elements.append(transactions_table)
 
-    def _add_category_stats(self, expense_stats: Dict[str, Tuple]):
+    def _add_category_stats(self, expense_stats: Optional[Dict[str, CategoryStats]]):
         if expense_stats:
-            title = [("Category", "Total Amount", "Percentage")]
-            data = [(category, "{:.2f}".format(total), "{:.2f} %".format(percentage * 100))
-                    for category, (total, percentage) in expense_stats.items()]
+            title = [("Category", "Total Amount", "Count", "Mean Amount", "Percentage")]
+            data = [(category, "{:.2f}".format(stats.total), str(stats.count), "{:.2f}".format(abs(stats.mean)),
+                     "{:.2f} %".format(stats.share * 100))
+                    for category, stats in expense_stats.items()]
             data.sort(key=lambda x: float(x[1]), reverse=True)
             stats_table = Table(title + data, spaceAfter=40)
             stats_table.setStyle(TableStyle([("FONTNAME", (0, 0), (-1, 0), self.font_bold),
@@ -95,7 +97,7 @@ class StatementReportGenerator:
 
     def _add_pie_chart(
             self,
-            expense_stats: Dict[str, Tuple],
+            expense_stats: Optional[Dict[str, CategoryStats]],
             size: int,
             padding: int,
     ):
@@ -106,7 +108,7 @@ class StatementReportGenerator:
             pie_chart.y = padding
             pie_chart.width = size
             pie_chart.height = size
-            pie_chart.data = [i[0] for i in expense_stats.values()]
+            pie_chart.data = [i.total for i in expense_stats.values()]
             pie_chart.labels = list(expense_stats.keys())
             pie_chart.slices.strokeWidth = 0.5
             pie_chart.sideLabels = True
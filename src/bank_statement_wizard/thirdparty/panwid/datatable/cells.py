@@ -215,8 +215,22 @@ class DataTableBodyCell(DataTableCell):
 
     ATTR = "table_row_body"
 
+    def rebind(self, value_attr=None):
+        """
+        Updates the cell after its row has been pointed at another data frame row, the contents are only rebuilt
+        when the value changed.
+        """
+        if value_attr != self.value_attr:
+            self.value_attr = value_attr
+            self.set_attr_maps()
+        self.unhighlight()
+        if _differs(self.value, self.contents_value):
+            self.update_contents()
+            self.filler.original_widget = self.contents
+
     def update_contents(self):
 
+        self.contents_value = self.value
         try:
             contents = self.table.decorate(
                 self.row,
@@ -239,7 +253,16 @@ class DataTableBodyCell(DataTableCell):
 
 
 class DataTableDividerBodyCell(DataTableDividerCell, DataTableBodyCell):
-    pass
+
+    def rebind(self, value_attr=None):
+        pass
+
+
+def _differs(a, b) -> bool:
+    try:
+        return bool(a != b)
+    except (TypeError, ValueError):  # e.g. arrays
+        return True
 
 
 class DataTableHeaderCell(DataTableCell):
@@ -0,0 +1,380 @@
+import json
+from typing import Dict, Optional, List, Any, Sequence, Callable
+
+import numpy as np
+
+__all__ = ["ColumnarDataFrame"]
+
+
+def _is_list(value) -> bool:
+    return isinstance(value, (list, tuple, np.ndarray))
+
+
+def _to_python(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _to_array(values: Sequence[Any]) -> np.ndarray:
+    """
+    Stores bool, integer and float columns in typed arrays, anything else including missing values as objects.
+    """
+    if isinstance(values, np.ndarray) and values.dtype.kind in "bif":
+        return values.copy()
+    values = list(values)
+    types = set(map(type, values))
+    if types and types <= {bool, np.bool_}:
+        return np.array(values, dtype=bool)
+    if types and types <= {int, np.int64, np.int32}:
+        try:
+            return np.array(values, dtype=np.int64)
+        except OverflowError:
+            pass
+    elif types and types <= {int, float, np.int64, np.int32, np.float64}:
+        return np.array(values, dtype=np.float64)
+    array = np.empty(len(values), dtype=object)
+    array[:] = values
+    return array
+
+
+def _can_store(array: np.ndarray, values: np.ndarray) -> bool:
+    if array.dtype == object:
+        return True
+    return values.dtype.kind in {"b": "b", "i": "bi", "f": "bif"}.get(array.dtype.kind, "")
+
+
+class ColumnarDataFrame:
+    """
+    Data frame with a column array per column and a hashed index, exposing the subset of the raccoon DataFrame
+    interface the data table uses. Rows keep their insertion order, rows are looked up through the index in O(1),
+    whole columns are set and read with numpy operations and sorting is an argsort followed by one take per column.
+    Column arrays have spare capacity so appending rows is amortised O(1), a column only becomes an object column
+    when values of another type are stored in it. Unlike raccoon the index is never kept sorted, use `sort_index`.
+    """
+
+    def __init__(self, data: Optional[Dict[Any, Sequence]] = None, columns: Optional[List[Any]] = None,
+                 index: Optional[Sequence[Any]] = None, index_name: Any = "index"):
+        data = data or {}
+        columns = list(columns) if columns else list(data)
+        columns += [c for c in data if c not in columns]
+        length = len(next(iter(data.values()))) if data else len(index or [])
+
+        self._index_name = index_name
+        self._index: List[Any] = list(index) if index is not None else list(range(length))
+        self._validate_index(self._index)
+        self._positions: Dict[Any, int] = {i: position for position, i in enumerate(self._index)}
+        # arrays of every column, only the first len(self) values are rows
+        self._data: Dict[Any, np.ndarray] = {}
+        for c in columns:
+            values = data.get(c)
+            if values is None:
+                values = [None] * len(self._index)
+            elif len(values) != len(self._index):
+                raise ValueError(f"length of column {c} does not match the index length")
+            self._data[c] = _to_array(values)
+
+    def _validate_index(self, indexes):
+        if len(indexes) != len(set(indexes)):
+            raise ValueError("index contains duplicates")
+
+    @classmethod
+    def from_json(cls, json_string: str) -> "ColumnarDataFrame":
+        input_dict = json.loads(json_string)
+        meta_data = input_dict["meta_data"]
+        return cls(data=input_dict["data"], columns=meta_data["columns"], index=input_dict["index"],
+                   index_name=meta_data["index_name"])
+
+    def to_json(self) -> str:
+        return json.dumps({"data": {c: self._column_list(c) for c in self._data}, "index": self.index,
+                           "meta_data": {"index_name": self._index_name, "columns": self.columns}})
+
+    @property
+    def index(self) -> List[Any]:
+        """
+        The index as a list, changing the returned list corrupts the data frame.
+        """
+        return self._index
+
+    @property
+    def index_name(self) -> Any:
+        return self._index_name
+
+    @property
+    def columns(self) -> List[Any]:
+        return list(self._data)
+
+    @property
+    def data(self) -> List[List[Any]]:
+        return [self._column_list(c) for c in self._data]
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def position(self, index: Any) -> int:
+        try:
+            return self._positions[index]
+        except KeyError:
+            raise ValueError(f"{index} is not in index")
+
+    def positions(self, indexes: Sequence[Any]) -> np.ndarray:
+        return np.fromiter((self.position(i) for i in indexes), dtype=np.intp, count=len(indexes))
+
+    def column_array(self, column: Any) -> np.ndarray:
+        """
+        Returns the array of the column, changing the returned array changes the data frame.
+        """
+        return self._data[column][:len(self._index)]
+
+    def _column_list(self, column: Any, positions: Optional[np.ndarray] = None) -> List[Any]:
+        values = self.column_array(column)
+        return (values if positions is None else values[positions]).tolist()
+
+    def _row(self, position: int, columns: Optional[List[Any]] = None, index: bool = True) -> Dict[Any, Any]:
+        row = {c: _to_python(self._data[c][position]) for c in (self._data if columns is None else columns)}
+        if index:
+            row[self._index_name] = self._index[position]
+        return row
+
+    def get(self, indexes: Any = None, columns: Any = None, as_list: bool = False, as_dict: bool = False):
+        if indexes is not None and not _is_list(indexes) and not isinstance(indexes, slice):
+            if columns is not None and not _is_list(columns):
+                return _to_python(self._data[columns][self.position(indexes)])
+            return self.get_columns(indexes, columns, as_dict=as_dict)
+
+        positions = None if indexes is None else self._selection(indexes)
+        if columns is not None and not _is_list(columns) and as_list:
+            return self._column_list(columns, positions)
+        return self._take(positions, [columns] if columns is not None and not _is_list(columns) else columns)
+
+    def get_columns(self, index: Any, columns: Optional[List[Any]] = None, as_dict: bool = False,
+                    include_index: bool = True):
+        return self.get_location(self.position(index), columns, as_dict, include_index)
+
+    def get_location(self, location: int, columns: Optional[List[Any]] = None, as_dict: bool = False,
+                     index: bool = True):
+        if as_dict:
+            return self._row(location, columns, index)
+        return self._take(np.array([location], dtype=np.intp), columns)
+
+    def get_entire_column(self, column: Any, as_list: bool = False):
+        return self._column_list(column) if as_list else self._take(None, [column])
+
+    def _selection(self, indexes: Any) -> np.ndarray:
+        if isinstance(indexes, slice):
+            return np.arange(len(self))[indexes]
+        if len(indexes) and all(isinstance(i, (bool, np.bool_)) for i in indexes):
+            return np.flatnonzero(np.asarray(indexes, dtype=bool))
+        return self.positions(indexes)
+
+    def _take(self, positions: Optional[np.ndarray], columns: Optional[List[Any]] = None) -> "ColumnarDataFrame":
+        columns = self.columns if columns is None else list(columns)
+        frame = ColumnarDataFrame.__new__(type(self))
+        frame._index_name = self._index_name
+        frame._index = list(self._index) if positions is None else [self._index[i] for i in positions.tolist()]
+        frame._positions = {i: position for position, i in enumerate(frame._index)}
+        frame._data = {c: (self.column_array(c) if positions is None else self.column_array(c)[positions]).copy()
+                       for c in columns}
+        return frame
+
+    def set(self, indexes: Any = None, columns: Any = None, values: Any = None):
+        if indexes is not None and columns is not None:
+            if _is_list(indexes):
+                self.set_column(indexes, columns, values)
+            else:
+                self.set_cell(indexes, columns, values)
+        elif indexes is not None:
+            self.set_row(indexes, values)
+        elif columns is not None:
+            self.set_column(None, columns, values)
+        else:
+            raise ValueError("either or both of indexes or columns must be provided")
+
+    def set_cell(self, index: Any, column: Any, value: Any):
+        if index not in self._positions:
+            self._add_rows([index], {column: [value]})
+        else:
+            self._store(column, np.array([self._positions[index]], dtype=np.intp), [value])
+
+    def set_row(self, index: Any, values: Dict[Any, Any]):
+        if index not in self._positions:
+            self._add_rows([index], {column: [value] for column, value in values.items()})
+            return
+        position = np.array([self._positions[index]], dtype=np.intp)
+        for column, value in values.items():
+            self._store(column, position, [value])
+
+    def set_column(self, indexes: Optional[Sequence[Any]], column: Any, values: Any):
+        """
+        Sets the values of a column for the given indexes, all of them if None. Indexes that are not in the data frame
+        are added, a single value is set for all the indexes.
+        """
+        by_index = False
+        if indexes is None:
+            positions = None
+        elif len(indexes) and all(isinstance(i, (bool, np.bool_)) for i in indexes):
+            if len(indexes) != len(self):
+                raise ValueError("boolean index list must be same size of existing index")
+            positions = np.flatnonzero(np.asarray(indexes, dtype=bool))
+        else:
+            positions, by_index = indexes, True
+
+        count = len(self) if positions is None else len(positions)
+        if not _is_list(values):
+            values = [values] * count
+        elif len(values) != count:
+            raise ValueError("values and index lengths are not equal")
+
+        if by_index:
+            new_values = {i: v for i, v in zip(indexes, values) if i not in self._positions}
+            if new_values:
+                self._add_rows(list(new_values), {column: list(new_values.values())})
+                if len(new_values) == len(indexes):
+                    return
+            positions = self.positions(indexes)
+        self._store(column, positions, values)
+
+    def _store(self, column: Any, positions: Optional[np.ndarray], values: Sequence[Any]):
+        if positions is None or (len(positions) == len(self) and len(self) > 0 and
+                                 np.array_equal(positions, np.arange(len(self)))):
+            # a whole column is replaced, its type is decided again
+            self._data[column] = _to_array(values)
+            return
+        if column not in self._data:
+            self._data[column] = _to_array([None] * len(self))
+        array = self._data[column]
+        values = _to_array(values)
+        if not _can_store(array, values):
+            array = self._data[column] = array.astype(object)
+        array[positions] = values
+
+    def _add_rows(self, indexes: List[Any], values: Optional[Dict[Any, Sequence[Any]]] = None):
+        """
+        Appends rows given their values per column, values of the other columns are None.
+        """
+        values = values or {}
+        start = len(self._index)
+        size = start + len(indexes)
+        for c in [*self._data, *(c for c in values if c not in self._data)]:
+            column_values = _to_array(values[c] if c in values else [None] * len(indexes))
+            if start == 0:
+                array = np.empty(0, dtype=column_values.dtype)  # an empty column takes the type of its values
+            else:
+                array = self._data[c] if c in self._data else _to_array([None] * start)
+                if not _can_store(array, column_values):
+                    array = array.astype(object)
+            if len(array) < size:
+                # grow geometrically so appending rows one by one is amortised O(1)
+                grown = np.empty(max(size, 2 * len(array)), dtype=array.dtype)
+                grown[:start] = array[:start]
+                array = grown
+            array[start:size] = column_values
+            self._data[c] = array
+        self._index += indexes
+        for position, i in enumerate(indexes, start):
+            self._positions[i] = position
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            indexes, columns = key
+            return self.get(indexes, columns)
+        return self._take(None, key if _is_list(key) else [key])
+
+    def __setitem__(self, key, value):
+        if isinstance(key, tuple):
+            indexes, column = key
+            if _is_list(indexes):
+                self.set_column(indexes, column, value)
+            else:
+                self.set_cell(indexes, column, value)
+        else:
+            self.set_column(None, key, value)
+
+    def to_list(self) -> List[Any]:
+        if len(self._data) != 1:
+            raise TypeError("only a single column data frame can be converted to a list")
+        return self._column_list(next(iter(self._data)))
+
+    def to_dict(self, index: bool = True) -> Dict[Any, List[Any]]:
+        output = {self._index_name: list(self._index)} if index else {}
+        output.update({c: self._column_list(c) for c in self._data})
+        return output
+
+    def iterrows(self, index: bool = True):
+        columns = {c: self._column_list(c) for c in self._data}
+        for position, i in enumerate(self._index):
+            row = {c: values[position] for c, values in columns.items()}
+            if index:
+                row[self._index_name] = i
+            yield row
+
+    def head(self, rows: int) -> "ColumnarDataFrame":
+        return self._take(np.arange(min(rows, len(self))))
+
+    def tail(self, rows: int) -> "ColumnarDataFrame":
+        return self._take(np.arange(max(len(self) - rows, 0), len(self)))
+
+    def append(self, data_frame: "ColumnarDataFrame"):
+        if not len(data_frame):
+            return
+        if set(self._positions).intersection(data_frame.index):
+            raise ValueError("duplicate indexes in DataFrames")
+        self._add_rows(list(data_frame.index), {c: data_frame.column_array(c) for c in data_frame.columns})
+
+    def _reorder(self, order: np.ndarray):
+        self._index = [self._index[i] for i in order.tolist()]
+        self._positions = {i: position for position, i in enumerate(self._index)}
+        for c in self._data:
+            self._data[c] = self.column_array(c)[order]
+
+    def sort_columns(self, column: Any, key: Optional[Callable[[Any], Any]] = None, reverse: bool = False):
+        """
+        Stable sort of the rows by a column, missing values go last. Typed columns without a key are sorted by numpy,
+        the order is applied to every column with a single take.
+        """
+        values = self.column_array(column)
+        if key is None and values.dtype != object:
+            if reverse:
+                # stable descending order, equal values keep their order
+                order = len(values) - 1 - np.argsort(values[::-1], kind="stable")[::-1]
+            else:
+                order = np.argsort(values, kind="stable")
+        else:
+            if key is None:
+                def key(x):
+                    return x is None, x
+            keys = [key(v) for v in values.tolist()]
+            order = np.array(sorted(range(len(keys)), key=keys.__getitem__, reverse=reverse), dtype=np.intp)
+        self._reorder(order)
+
+    def sort_index(self):
+        order = np.array(sorted(range(len(self._index)), key=self._index.__getitem__), dtype=np.intp)
+        self._reorder(order)
+
+    def delete_rows(self, indexes: Any):
+        indexes = indexes if _is_list(indexes) else [indexes]
+        keep = np.ones(len(self), dtype=bool)
+        keep[self._selection(indexes)] = False
+        for c in self._data:
+            self._data[c] = self.column_array(c)[keep]
+        self._index = [i for i, k in zip(self._index, keep.tolist()) if k]
+        self._positions = {i: position for position, i in enumerate(self._index)}
+
+    def delete_all_rows(self):
+        self._index = []
+        self._positions = {}
+        for c, array in self._data.items():
+            self._data[c] = array[:0]
+
+    def delete_columns(self, columns: Any):
+        for c in (columns if _is_list(columns) else [columns]):
+            del self._data[c]
+
+    def __str__(self) -> str:
+        names = [str(self._index_name)] + [str(c) for c in self._data]
+        rows = [[str(i)] + [str(_to_python(self._data[c][p])) for c in self._data]
+                for p, i in enumerate(self._index)]
+        widths = [max([len(n)] + [len(r[k]) for r in rows]) for k, n in enumerate(names)]
+        lines = ["  ".join(v.ljust(w) for v, w in zip(line, widths)) for line in [names] + rows]
+        return "\n".join(lines)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(length={len(self)}, columns={self.columns})"
@@ -1,7 +1,10 @@
 import collections
-import raccoon as rc
-from typing import Dict, Optional, List, Any
+from typing import Dict, Optional, List, Any, Sequence
 
+import numpy as np
+from orderedattrdict import AttrDict
+
+from .columnar import ColumnarDataFrame
 from ..logger import get_logger
 
 logger = get_logger()
@@ -9,15 +12,21 @@ logger = get_logger()
 ColumnName = str
 
 
-class DataTableDataFrame(rc.DataFrame):
-    DEFAULT_COLUMNS = ["_dirty", "_focus_position", "_value_fn", "_cls", "_details", "_rendered_row"]
+def _select(values: Sequence, mask: np.ndarray) -> Sequence:
+    if isinstance(values, np.ndarray):
+        return values[mask]
+    return [v for v, m in zip(values, mask) if m]
+
+
+class DataTableDataFrame(ColumnarDataFrame):
+    DEFAULT_COLUMNS = ["_dirty", "_focus_position", "_value_fn", "_cls", "_details"]
 
     def __init__(self, data: Optional[Dict[ColumnName, List]] = None, columns: Optional[List[ColumnName]] = None,
-                 index: Optional[List[Any]] = None, index_name: ColumnName = "index", sort: bool = None):
+                 index: Optional[List[Any]] = None, index_name: ColumnName = "index"):
         if columns and index_name not in columns:
             columns.insert(0, index_name)
         columns += self.DEFAULT_COLUMNS
-        super().__init__(data=data, columns=columns, index=index, index_name=index_name, sort=sort)
+        super().__init__(data=data, columns=columns, index=index, index_name=index_name)
 
     def _validate_index(self, indexes):
         try:
@@ -70,8 +79,8 @@ class DataTableDataFrame(rc.DataFrame):
         data = self.transpose_data(rows)
         if not limit:
             if len(rows):
-                indexes = [x for x in self.index if x not in data.get(
-                    self.index_name, [])]
+                remaining = set(data.get(self.index_name, []))
+                indexes = [x for x in self.index if x not in remaining]
                 if len(indexes):
                     self.delete_rows(indexes)
             else:
@@ -95,6 +104,49 @@ class DataTableDataFrame(rc.DataFrame):
                 raise Exception(c, len(self.index), len(data[c]))
         return data.get(self.index_name, [])
 
+    def update_columns(self, columns: Dict[ColumnName, Sequence], limit=None):
+        """
+        Same as update_rows for rows given as columns, the columns are set as a whole and indexes are diffed as sets.
+        """
+        length = len(next(iter(columns.values()))) if columns else 0
+        if not limit and self.index_name not in columns:
+            self.delete_all_rows()
+        if self.index_name in columns:
+            index = list(columns[self.index_name])
+        else:
+            index = list(range(len(self), len(self) + length))
+
+        existing = set(self.index)
+        if not limit:
+            remaining = set(index)
+            indexes = [x for x in self.index if x not in remaining]
+            if len(indexes):
+                self.delete_rows(indexes)
+        if not length:
+            return []
+
+        columns = {**columns, self.index_name: index}
+        is_new = np.fromiter((x not in existing for x in index), dtype=bool, count=len(index))
+        if not is_new.any():
+            for c, values in columns.items():
+                self.set(index, c, values)
+            return index
+
+        # new rows are added at once with the values of all their columns, so the column types are kept even when
+        # the rows are sorted and the indexes of the existing rows are not the first of the given indexes
+        new_indexes = _select(index, is_new)
+        new_values = {c: _select(values, is_new) for c, values in columns.items()}
+        # rows given as columns are read back as AttrDicts, like rows without a class
+        new_values["_cls"] = [AttrDict] * len(new_indexes)
+        new_values["_details"] = [{"open": False, "disabled": False} for _ in new_indexes]
+        self._add_rows(new_indexes, new_values)
+        if not is_new.all():
+            is_existing = ~is_new
+            existing_indexes = _select(index, is_existing)
+            for c, values in columns.items():
+                self.set(existing_indexes, c, _select(values, is_existing))
+        return index
+
     def append_rows(self, rows):
         length = len(rows)
         if not length:
@@ -116,7 +168,6 @@ class DataTableDataFrame(rc.DataFrame):
         kwargs = dict(
             columns=colnames,
             data=data,
-            sort=False,
             index=data[self.index_name],
             index_name=self.index_name,
         )
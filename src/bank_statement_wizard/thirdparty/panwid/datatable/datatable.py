@@ -1,9 +1,11 @@
 import copy
 import math
+import collections.abc
 import traceback
 from dataclasses import *
-from typing import List, Dict, Any, Optional, Sequence, Callable, Tuple
+from typing import List, Dict, Any, Optional, Sequence, Callable, Tuple, Union
 
+import numpy as np
 import urwid_utils.palette
 
 from .columns import *
@@ -19,6 +21,7 @@ logger = get_logger()
 
 
 DEFAULT_TABLE_DIVIDER = DataTableDivider(" ")
+DEFAULT_OVERSCAN = 20
 
 ColumnIndex = int
 RowIndex = int
@@ -44,9 +47,12 @@ class DataTable(urwid.WidgetWrap, urwid.listbox.ListWalker):
     highlight_focus_map = {}
     highlight_focus_map2 = {}
 
+    # rows assumed to be visible before the first render reports the height
+    DEFAULT_VISIBLE_ROWS = 50
+
     def __init__(self,
                  columns: List[DataTableColumn],
-                 data: Optional[Dict[str, Any]] = None,
+                 data: Optional[Union[List[Dict[str, Any]], Dict[str, Sequence]]] = None,
                  limit: Optional[int] = None,
                  index_column_name: str = "index",
                  with_header: bool = True,
@@ -68,7 +74,8 @@ class DataTable(urwid.WidgetWrap, urwid.listbox.ListWalker):
                  detail_hanging_indent=None,
                  ui_sort=True,
                  ui_resize=True,
-                 row_attr_fn=None):
+                 row_attr_fn=None,
+                 overscan: int = DEFAULT_OVERSCAN):
 
         if not columns:
             raise Exception("Columns must be defined for the data table")
@@ -114,6 +121,11 @@ class DataTable(urwid.WidgetWrap, urwid.listbox.ListWalker):
         self.ui_sort = ui_sort
         self.ui_resize = ui_resize
         self.row_attr_fn = row_attr_fn
+        self.overscan = overscan
+
+        # row widgets exist only for the viewport and the overscan around it, least recently displayed ones are
+        # recycled for the rows scrolled into view
+        self._row_cache: "collections.OrderedDict[Any, DataTableBodyRow]" = collections.OrderedDict()
 
         self._focus = 0
         self.page = 0
@@ -124,8 +136,15 @@ class DataTable(urwid.WidgetWrap, urwid.listbox.ListWalker):
         self._initialized = False
         self._message_showing = False
 
-        self.filters: Optional[List[Callable]] = None
-        self.filtered_rows = list()
+        # filters are row predicates or bitmaps over the data frame positions, the rows passing all of them form
+        # the filter bitmap and the filtered rows are its set positions
+        self.filters: Optional[List[Union[Callable, np.ndarray]]] = None
+        self.filter_bitmap: np.ndarray = np.zeros(0, dtype=bool)
+        self.filtered_rows: np.ndarray = np.zeros(0, dtype=np.intp)
+        self._filter_ranks: np.ndarray = np.zeros(0, dtype=np.intp)  # position of each row among the filtered rows
+
+        # data frame index -> data frame position
+        self._index_positions: Dict[Any, int] = {}
 
         if self.divider:
             self._columns = list(intersperse_divider(self._columns, self.divider))
@@ -135,7 +154,6 @@ class DataTable(urwid.WidgetWrap, urwid.listbox.ListWalker):
 
         self.data_frame = DataTableDataFrame(
             columns=self.column_names,
-            sort=False,
             index_name=self.index_column_name or None
         )
 
@@ -353,7 +371,66 @@ class DataTable(urwid.WidgetWrap, urwid.listbox.ListWalker):
         return self.data_frame.index[position]
 
     def index_to_position(self, index):
-        return self.data_frame.index.index(index)
+        try:
+            return self._index_positions[index]
+        except KeyError:
+            raise ValueError(f"{index} is not in the data table")
+
+    def index_to_focus_position(self, index):
+        """
+        Returns the position of the row among the filtered rows, i.e. the position to focus to show the row.
+        """
+        position = self.index_to_position(index)
+        if not self.filter_bitmap[position]:
+            raise ValueError(f"{index} is filtered out of the data table")
+        return int(self._filter_ranks[position])
+
+    def focus_index(self, index):
+        self.focus_position = self.index_to_focus_position(index)
+
+    def _update_index_positions(self, start=0):
+        index = self.data_frame.index
+        if start == 0:
+            self._index_positions = {i: position for position, i in enumerate(index)}
+        else:
+            for position in range(start, len(index)):
+                self._index_positions[index[position]] = position
+
+    def index_bitmap(self, indexes: Sequence[Any], values: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Returns a bitmap over the data frame positions with the rows of the indexes set, to the corresponding values
+        if given. Indexes that are not in the data table are ignored.
+        """
+        positions = np.fromiter((self._index_positions.get(i, -1) for i in indexes), dtype=np.intp,
+                                count=len(indexes))
+        present = positions >= 0
+        bitmap = np.zeros(len(self.data_frame), dtype=bool)
+        bitmap[positions[present]] = True if values is None else np.asarray(values, dtype=bool)[present]
+        return bitmap
+
+    def _set_filter_bitmap(self, bitmap: np.ndarray):
+        self.filter_bitmap = bitmap
+        self.filtered_rows = np.flatnonzero(bitmap)
+        self._filter_ranks = np.cumsum(bitmap) - 1
+        if self._focus >= len(self.filtered_rows):
+            self._focus = max(len(self.filtered_rows) - 1, 0)
+
+    def _reindex_rows(self, previous_positions: Dict[Any, int]):
+        """
+        Updates the index positions after the rows moved, the filter bitmaps move along with the rows. Rows that are
+        new to the data frame pass the bitmaps until the filters are applied again.
+        """
+        self._update_index_positions()
+        self._reindex_filters(np.fromiter((previous_positions.get(i, -1) for i in self.data_frame.index),
+                                          dtype=np.intp, count=len(self.data_frame)))
+
+    def _reindex_filters(self, previous_positions: np.ndarray):
+        def reindex(bitmap):
+            return np.append(bitmap, True)[previous_positions]
+
+        if self.filters:
+            self.filters = [reindex(f) if isinstance(f, np.ndarray) else f for f in self.filters]
+        self._set_filter_bitmap(reindex(self.filter_bitmap))
 
     def get_dataframe_row(self, index):
         try:
@@ -382,12 +459,12 @@ class DataTable(urwid.WidgetWrap, urwid.listbox.ListWalker):
             return AttrDict(**d)
 
     def get_row(self, index):
-        row = self.data_frame.get(index, "_rendered_row")
+        row = self._row_cache.get(index)
 
         if self.data_frame.get(index, "_dirty") or row is None:
             self.refresh_calculated_fields([index])
             vals = self.get_dataframe_row(index)
-            row = self.render_item(index)
+            row = self._reuse_row_widget(index, row)
             if self.row_attr_fn:
                 attr = self.row_attr_fn(vals)
                 if attr:
@@ -395,10 +472,34 @@ class DataTable(urwid.WidgetWrap, urwid.listbox.ListWalker):
             focus = self.data_frame.get(index, "_focus_position")
             if focus is not None:
                 row.set_focus_column(focus)
-            self.data_frame.set(index, "_rendered_row", row)
             self.data_frame.set(index, "_dirty", False)
+        self._row_cache[index] = row
+        self._row_cache.move_to_end(index)
+        return row
+
+    def _reuse_row_widget(self, index, row=None):
+        if row is None and len(self._row_cache) >= self.row_cache_size:
+            _, row = self._row_cache.popitem(last=False)
+        if row is None:
+            return self.render_item(index)
+        row.rebind(index)
         return row
 
+    @property
+    def row_cache_size(self) -> int:
+        return (self.height or self.DEFAULT_VISIBLE_ROWS) + 2 * self.overscan
+
+    @property
+    def rendered_rows(self) -> List[DataTableBodyRow]:
+        return list(self._row_cache.values())
+
+    def _forget_rows(self, indexes=None):
+        if indexes is None:
+            self._row_cache.clear()
+            return
+        for index in indexes:
+            self._row_cache.pop(index, None)
+
     def get_row_by_position(self, position):
         index = self.position_to_index(self.filtered_rows[position])
         return self.get_row(index)
@@ -489,7 +590,7 @@ class DataTable(urwid.WidgetWrap, urwid.listbox.ListWalker):
 
         row_index: Optional[RowIndex] = None
 
-        if self.sort_refocus:
+        if self.sort_refocus and len(self):
             row_index = self[self._focus].data.get(self.index_column_name, None)
             logger.debug(f"row_index: {row_index}")
 
@@ -500,18 +601,18 @@ class DataTable(urwid.WidgetWrap, urwid.listbox.ListWalker):
             self.header.update_sort(self.sort_by)
 
         self.set_focus_column(self.sort_column)
-        if row_index:
-            self.focus_position = self.index_to_position(row_index)
+        if row_index is not None:
+            self.focus_index(row_index)
 
     def sort(self, column, key: Optional[Callable[[Any], Tuple[bool, Any]]] = None):
-        if not key:
-            def key(x):
-                return x is None, x
-
+        # without a key the data frame sorts missing values last, typed columns are sorted by numpy
+        previous_positions = self._index_positions
         self.data_frame.sort_columns(
             column,
             key=key,
             reverse=self.sort_by.is_reverse)
+        # rows keep their filtered state while the data frame is reordered, the filters are not evaluated again
+        self._reindex_rows(previous_positions)
         self._modified()
 
     def set_focus_column(self, index):
@@ -545,7 +646,9 @@ class DataTable(urwid.WidgetWrap, urwid.listbox.ListWalker):
         self.sort_by_column(index)
 
     def sort_index(self):
+        previous_positions = self._index_positions
         self.data_frame.sort_index()
+        self._reindex_rows(previous_positions)
         self._modified()
 
     def add_columns(self, columns, data=None):
@@ -623,7 +726,7 @@ class DataTable(urwid.WidgetWrap, urwid.listbox.ListWalker):
             raise NotImplementedError
         if self.with_header:
             self.header.update()
-        for r in self:
+        for r in self.rendered_rows:
             r.update()
         if self.with_footer:
             self.footer.update()
@@ -725,19 +828,19 @@ class DataTable(urwid.WidgetWrap, urwid.listbox.ListWalker):
             logger.warning(f"{sum(widths)} != {sum(new_widths)}")
 
     def resize_body_rows(self):
-        for r in self:
+        for r in self.rendered_rows:
             r.on_resize()
 
     def enable_cell_selection(self):
         logger.debug("enable_cell_selection")
-        for r in self:
+        for r in self.rendered_rows:
             r.enable_cell_selection()
         self.reset()
         self.cell_selection = True
 
     def disable_cell_selection(self):
         logger.debug("disable_cell_selection")
-        for r in self:
+        for r in self.rendered_rows:
             r.disable_cell_selection()
         self.reset()
         self.cell_selection = False
@@ -764,14 +867,24 @@ class DataTable(urwid.WidgetWrap, urwid.listbox.ListWalker):
         return [c for c in self.data_columns if not c.hide]
 
     def add_row(self, data, sort=True):
-
+        start = len(self.data_frame)
         self.data_frame.append_rows([data])
+        self._update_index_positions(start)
+        self._reindex_filters(np.append(np.arange(start), np.full(len(self.data_frame) - start, -1)))
         if sort:
             self.sort_by_column()
         self.apply_filters()
 
     def delete_rows(self, indexes):
+        if not isinstance(indexes, list):
+            indexes = [indexes]
+        self._forget_rows(indexes)
+        positions = [self._index_positions.pop(i) for i in indexes]
+        previous_positions = np.delete(np.arange(len(self.data_frame)), positions)
         self.data_frame.delete_rows(indexes)
+        # only the rows after the first deleted one move
+        self._update_index_positions(min(positions, default=len(self.data_frame)))
+        self._reindex_filters(previous_positions)
         self.apply_filters()
         if self.focus_position > 0 and self.focus_position >= len(self)-1:
             self.focus_position = len(self)-1
@@ -830,19 +943,26 @@ class DataTable(urwid.WidgetWrap, urwid.listbox.ListWalker):
         elif not isinstance(filters, list):
             filters = [filters]
 
-        self.filtered_rows = list(
-            i
-            for i, row in enumerate(self.data_frame.iterrows())
-            if not filters or all(
-                f(row)
-                for f in filters
-            )
-        )
-
+        bitmap = np.ones(len(self.data_frame), dtype=bool)
+        predicates = []
+        for f in filters or []:
+            if isinstance(f, np.ndarray):
+                if len(f) != len(bitmap):
+                    raise ValueError(f"Filter bitmap of length {len(f)} for {len(bitmap)} rows")
+                bitmap &= f
+            else:
+                predicates.append(f)
+        if predicates:
+            # predicates are only evaluated for the rows the bitmaps leave in
+            for position in np.flatnonzero(bitmap).tolist():
+                row = self.data_frame.get_location(position, as_dict=True)
+                bitmap[position] = all(f(row) for f in predicates)
+
+        self._set_filter_bitmap(bitmap)
         self.filters = filters
 
     def clear_filters(self):
-        self.filtered_rows = list(range(len(self.data_frame)))
+        self._set_filter_bitmap(np.ones(len(self.data_frame), dtype=bool))
         self.filters = None
 
     def load_all(self):
@@ -892,24 +1012,31 @@ class DataTable(urwid.WidgetWrap, urwid.listbox.ListWalker):
             kwargs["offset"] = offset
             kwargs["limit"] = limit
 
-        if self.data is not None:
-            rows = self.data
+        previous_positions = self._index_positions
+        if isinstance(self.data, collections.abc.Mapping):
+            updated = self.data_frame.update_columns(self.data, limit=self.limit)
         else:
-            rows = list(self.query(**kwargs))
+            if self.data is not None:
+                rows = self.data
+            else:
+                rows = list(self.query(**kwargs))
 
-        for row in rows:
-            row["_cls"] = type(row)
+            for row in rows:
+                row["_cls"] = type(row)
 
-        updated = self.data_frame.update_rows(rows, limit=self.limit)
+            updated = self.data_frame.update_rows(rows, limit=self.limit)
+        self._reindex_rows(previous_positions)
+        if not self.limit:
+            remaining = set(updated)
+            self._forget_rows([i for i in self._row_cache if i not in remaining])
         self.data_frame["_focus_position"] = self.sort_column
 
         self.refresh_calculated_fields()
         self.apply_filters()
 
         if len(updated):
-            for i in updated:
-                pos = self.index_to_position(i)
-                self[pos].update()
+            # only rows with a widget are redrawn, and only once they are displayed again
+            self.data_frame[updated, "_dirty"] = True
             if self.sort_by:
                 self.sort_by_column(col=self.sort_by.field_name, reverse=self.sort_by.is_reverse)
 
@@ -920,6 +1047,14 @@ class DataTable(urwid.WidgetWrap, urwid.listbox.ListWalker):
         else:
             self.hide_message()
 
+    def load_columns(self, columns: Dict[str, Sequence]):
+        """
+        Loads the rows given as columns, e.g. {"id": [...], "amount": [...]}, without building a dict per row. Rows are
+        matched to the existing ones through the index column, the ones that are not given anymore are deleted.
+        """
+        self.data = columns
+        self.refresh()
+
     def refresh(self, reset=False):
         logger.debug(f"refresh: {reset}")
         offset = None
@@ -929,6 +1064,7 @@ class DataTable(urwid.WidgetWrap, urwid.listbox.ListWalker):
             self.page = 0
             offset = 0
             limit = self.limit
+            self._forget_rows()
             self.data_frame.delete_all_rows()
         else:
             try:
@@ -941,10 +1077,10 @@ class DataTable(urwid.WidgetWrap, urwid.listbox.ListWalker):
         if self._initialized:
             self.pack_columns()
 
-        if idx:
+        if idx is not None:
             try:
-                pos = self.index_to_position(idx)
-            except:
+                pos = self.index_to_focus_position(idx)
+            except ValueError:
                 pass
         self.focus_position = pos
 
@@ -1022,6 +1158,8 @@ class DataTable(urwid.WidgetWrap, urwid.listbox.ListWalker):
         with open(path, "r") as f:
             json = "\n".join(f.readlines())
             self.data_frame = DataTableDataFrame.from_json(json)
+        self._forget_rows()
+        self._reindex_rows({})
         self.reset()
 
     def save(self, path):
@@ -248,6 +248,24 @@ class DataTableBodyRow(DataTableRow):
     def data(self):
         return self.table.get_dataframe_row(self.index)
 
+    def rebind(self, index):
+        """
+        Points a recycled row widget at another data frame row, dropping the state of the previous one. Only the
+        cells whose values changed are rebuilt, the details are reopened if they are open for the new row.
+        """
+        self.content = index
+        self.pile.focus_position = 0
+        del self.pile.contents[1:]
+        self.box.height = self.row_height or 1
+        self.clear_attr(self.ATTR)
+        if [c.column for c in self.cells] != list(self.table.visible_columns):
+            self.update()
+        else:
+            for cell in self.cells:
+                cell.rebind(self.column_attr(cell.column))
+        if self.details_open:
+            self.open_details()
+
     def __getitem__(self, column):
         cls = self.table.data_frame[self.index, "_cls"]
         # row = self.data
@@ -409,19 +427,19 @@ class DataTableBodyRow(DataTableRow):
         focus_map[self.ATTR] = "%s focused" % (self.ATTR)
         self.attrmap.set_focus_map(focus_map)
 
-    def make_cells(self):
+    def column_attr(self, col):
+        if not isinstance(col, DataTableColumn) or col.attr is None:
+            return None
+        if callable(col.attr):
+            return col.attr(self.data)
+        elif col.attr in self.data:
+            return self.data[col.attr]
+        elif isinstance(col.attr, str):
+            return col.attr
+        else:
+            return None
 
-        def col_to_attr(col):
-            if col.attr is None:
-                return None
-            if callable(col.attr):
-                return col.attr(self.data)
-            elif col.attr in self.data:
-                return self.data[col.attr]
-            elif isinstance(col.attr, str):
-                return col.attr
-            else:
-                return None
+    def make_cells(self):
 
         return [
             DataTableBodyCell(
@@ -429,7 +447,7 @@ class DataTableBodyRow(DataTableRow):
                 col,
                 self,
                 # self.data[col.name] if not col.format_record else self.data,
-                value_attr=col_to_attr(col),
+                value_attr=self.column_attr(col),
                 cell_selection=self.cell_selection
             )
             if isinstance(col, DataTableColumn)
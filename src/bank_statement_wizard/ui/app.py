@@ -1,3 +1,4 @@
+import os
 import shutil
 import weakref
 from typing import Optional, Tuple, cast, List
@@ -47,6 +48,8 @@ class StatementsMenu:
     def _browse_statement(self, _):
         def _on_selected_file(path: str):
             MODEL.add_statement(path)
+            if self.parent().table is not None:
+                self.parent().table.reload()  # the ledger positions of the rows moved
             self._reset_loop_widget()
         browser = FileSelector(on_selected=_on_selected_file)
         self._set_loop_widget(create_overlay(browser.view))
@@ -78,7 +81,7 @@ class FilterMenu:
         parent = self.parent()
         if parent.table is not None:
             parent.table.clear_filters()
-            parent.table.apply_filters(filters)
+            parent.table.apply_ledger_filters(filters)
         self._reset_loop_widget()
 
     def _clear_table_filters(self):
@@ -102,8 +105,8 @@ class FilterMenu:
     def _clear_selections(self, _):
         parent = self.parent()
         if parent.table is not None:
-            for tid in MODEL.selected_transaction_ids:
-                parent.table.set_row_as_unselected(tid)
+            for position in MODEL.selected_positions:
+                parent.table.set_row_as_unselected(position)
         MODEL.clear_selections()
         self._reset_loop_widget()
 
@@ -124,10 +127,11 @@ class PlotMenu:
 
     def launch(self, _: urwid.Widget):
         balance_plot_button = urwid.Button("Balance Plot", self._plot_balance)
+        expense_plot_button = urwid.Button("Expense Plot", self._plot_expenses)
         done_button = urwid.Button("Done", lambda _: self._reset_loop_widget())
         self._set_loop_widget(
             create_overlay(create_line_box(urwid.Text("Plot Menu"), urwid.Divider("_", 0, 1),
-                                           balance_plot_button, done_button)))
+                                           balance_plot_button, expense_plot_button, done_button)))
 
     def _plot_balance(self, _):
         ax = pl.gca()
@@ -139,6 +143,40 @@ class PlotMenu:
         pl.gcf().autofmt_xdate()
         pl.show()
 
+    def _plot_expenses(self, _):
+        categories, totals = MODEL.expense_data()
+        pl.bar(categories, totals)
+        pl.gcf().autofmt_xdate()
+        pl.show()
+
+    def _set_loop_widget(self, widget: urwid.Widget):
+        self.parent().loop.widget = widget
+
+    def _reset_loop_widget(self):
+        self.parent().reset_to_main_view()
+
+
+class ExportMenu:
+    def __init__(self, parent: weakref.ref):
+        self.parent = parent
+
+    def launch(self, _: urwid.Widget):
+        path_to_snapshot = self.parent().path_to_snapshot
+        buttons = []
+        if path_to_snapshot:
+            buttons.append(urwid.Button(f"Save Snapshot to {path_to_snapshot}", self._save_snapshot))
+        done_button = urwid.Button("Done", lambda _: self._reset_loop_widget())
+        self._set_loop_widget(
+            create_overlay(create_line_box(urwid.Text("Export Menu"), urwid.Divider("_", 0, 1),
+                                           *buttons, done_button)))
+
+    def _save_snapshot(self, _):
+        try:
+            MODEL.save_snapshot(self.parent().path_to_snapshot)
+        except (OSError, ValueError) as e:
+            logger.error(f"Cannot save the snapshot: {e}")
+        self._reset_loop_widget()
+
     def _set_loop_widget(self, widget: urwid.Widget):
         self.parent().loop.widget = widget
 
@@ -147,7 +185,9 @@ class PlotMenu:
 
 
 class BankStatementWizardApp:
-    def __init__(self):
+    def __init__(self, path_to_snapshot: Optional[str] = None):
+        # the snapshot the ledger is read from, if it exists, and saved to from the export menu
+        self.path_to_snapshot: Optional[str] = path_to_snapshot
         self.main_view: Optional[urwid.Widget] = None
 
         self.header: Optional[urwid.Widget] = None
@@ -171,8 +211,12 @@ class BankStatementWizardApp:
         self.table: Optional[urwid.Widget] = None
 
         self.setup()
+        if path_to_snapshot is not None and os.path.exists(path_to_snapshot):
+            MODEL.open_snapshot(path_to_snapshot)
         self.loop = urwid.MainLoop(self.main_view, PALETTE, unhandled_input=self.unhandled_input, pop_ups=True)
         self.is_quitting: bool = False
+        if MODEL.has_data:
+            self.reset_to_main_view()
 
     def setup(self):
         self.create_title_widgets()
@@ -245,6 +289,8 @@ class BankStatementWizardApp:
         self.plot_menu_button.set_button_callback(plot_menu.launch)
 
         self.export_menu_button = TopMenuButton.from_label_and_key("Export Menu", "f5")
+        export_menu = ExportMenu(parent=weakref.ref(self))
+        self.export_menu_button.set_button_callback(export_menu.launch)
         self.search_button = TopMenuButton.from_label_and_key("Search", "f6")
         self.go_to_button = TopMenuButton.from_label_and_key("Go To...", "f7")
         self.done_button = TopMenuButton.from_label_and_key("Done", "f8")
@@ -276,5 +322,5 @@ class BankStatementWizardApp:
         self.loop.widget = self.main_view
 
 
-def run_ui():
-    BankStatementWizardApp().run()
+def run_ui(path_to_snapshot: Optional[str] = None):
+    BankStatementWizardApp(path_to_snapshot).run()
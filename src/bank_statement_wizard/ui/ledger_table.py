@@ -1,8 +1,9 @@
-from typing import Callable
+from typing import Callable, Optional, List
+
+import numpy as np
 
 from ..thirdparty import panwid
 from ..logging import get_logger
-from ..domain import TransactionId
 from .model import BankStatementWizardModel, SelectOperation
 
 logger = get_logger()
@@ -14,28 +15,47 @@ class LedgerTable(panwid.DataTable):
     def __init__(self, model: BankStatementWizardModel, input_handling: Callable, *args, **kwargs):
         self._model = model
         self._input_handling = input_handling
-        kwargs.update({"data": self._model.data()})
+        # rows are indexed by their ledger positions, which stay valid across sorting and filtering, the table is
+        # reloaded when the ledger changes
+        kwargs.update({"data": self._model.data_columns(), "row_attr_fn": self._row_attr,
+                       "index_column_name": "position"})
         super().__init__(*args, **kwargs)
 
+    def _row_attr(self, row) -> Optional[str]:
+        # row widgets are recycled while scrolling, highlights are derived from the model whenever a row is drawn
+        if self._model.is_selected(row["position"]):
+            return "table_row_body highlight"
+        return None
+
     def keypress(self, size, key):
         if key == "r":
-            self.refresh()
+            self.reload()
         elif key == "enter":
-            transaction_id = self.selection.data["id"]
-            if self._model.transaction_select_deselect(transaction_id) is SelectOperation.select:
-                self.set_row_as_selected(transaction_id)
+            position = self.selection.data["position"]
+            if self._model.transaction_select_deselect(position) is SelectOperation.select:
+                self.set_row_as_selected(position)
             else:
-                self.set_row_as_unselected(transaction_id)
+                self.set_row_as_unselected(position)
 
         self._input_handling(key)
         super().keypress(size, key)
 
-    def set_row_as_selected(self, transaction_id: TransactionId):
-        self.get_row(index=self._model.transaction_id_to_table_index[transaction_id]).set_attr(
-            "table_row_body highlight"
-        )
+    def reload(self):
+        self.load_columns(self._model.data_columns())
+
+    def set_row_as_selected(self, position: int):
+        self.invalidate_rows(position)
+
+    def set_row_as_unselected(self, position: int):
+        self.invalidate_rows(position)
+
+    def apply_ledger_filters(self, filters: List[np.ndarray]):
+        """
+        Applies bitmaps over the ledger positions, see BankStatementWizardModel.data_table_filter.
+        """
+        # the rows are indexed by the ledger positions, so the bitmaps are reordered like the rows
+        positions = np.asarray(self.data_frame.index, dtype=np.intp)
+        self.apply_filters([i[positions] for i in filters])
 
-    def set_row_as_unselected(self, transaction_id: TransactionId):
-        self.get_row(index=self._model.transaction_id_to_table_index[transaction_id]).clear_attr(
-            "table_row_body highlight"
-        )
+    def go_to_transaction(self, position: int):
+        self.focus_index(position)
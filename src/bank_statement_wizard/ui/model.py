@@ -4,11 +4,16 @@ from uuid import UUID
 from copy import deepcopy
 from datetime import date
 from enum import Enum, unique
-from typing import List, Dict, Tuple, Set, Union, Callable, Optional, Any
+from typing import List, Dict, Tuple, Set, Union, Callable, Optional, Sequence
 
-from ..domain import Ledger, Transaction, TransactionId
+import numpy as np
+
+from ..domain import BaseLedger, Ledger, Transaction, TransactionId, SqliteLedgerStore, LedgerSnapshot, \
+    SnapshotLedger, DateRange, save_ledger_snapshot, Direction, get_category_stats_for_ledger
 from ..logging import get_logger
-from ..parsing.support import get_loader, SupportedStatementTypes
+from ..parsing.cache import StatementCache
+from ..parsing.support import iter_transactions_from_statement, load_transactions_from_statements, \
+    get_cached_loader, SupportedStatementTypes
 
 __all__ = ["BankStatementWizardModel", "SelectOperation"]
 
@@ -23,18 +28,22 @@ class SelectOperation(str, Enum):
 
 
 class BankStatementWizardModel:
-    def __init__(self):
+    def __init__(self, statement_cache: Optional[StatementCache] = None,
+                 ledger_store: Optional[SqliteLedgerStore] = None):
         self._statements: List[str] = []
-        self.ledger: Ledger = Ledger()
+        # a ledger read from a snapshot keeps the snapshot open until the transactions are changed
+        self.ledger: BaseLedger = Ledger()
+        self.statement_cache: Optional[StatementCache] = statement_cache
+        self.ledger_store: Optional[SqliteLedgerStore] = ledger_store
 
-        self.all_transaction_ids: Set[TransactionId] = set()
-        self.selected_transaction_ids: Set[TransactionId] = set()
-        self.operated_transaction_ids: Set[TransactionId] = set()
-        self.transaction_id_to_table_index: Dict[TransactionId, int] = {}
+        # bitmaps over the ledger positions, `operated` marks the transactions that are not filtered. Transactions are
+        # referred to by their ledger positions, their ids are only resolved for the transactions that are acted on
+        self.selected: np.ndarray = np.zeros(0, dtype=bool)
+        self.operated: np.ndarray = np.zeros(0, dtype=bool)
 
     @property
     def has_data(self) -> bool:
-        return len(self._statements) > 0
+        return len(self._statements) > 0 or len(self.ledger) > 0
 
     @property
     def statements(self) -> List[str]:
@@ -46,70 +55,153 @@ class BankStatementWizardModel:
 
     def add_statement(self, path: str, statement_type: SupportedStatementTypes = SupportedStatementTypes.default()):
         path = os.path.abspath(path)
+        selected_transaction_ids = self.selected_transaction_ids
         try:
-            transactions = get_loader(statement_type.value)(path)
-            self.ledger.add_transactions(transactions)
+            if self.statement_cache is not None:
+                transactions = get_cached_loader(statement_type.value, self.statement_cache)(path)
+            else:
+                transactions = iter_transactions_from_statement(path, statement_type.value)
+            if self.ledger_store is not None:
+                transactions = list(transactions)
+                self.ledger_store.add_transactions(transactions)
+            self._editable_ledger().add_transactions_in_batches(transactions)
         except Exception as e:
             logger.error(f"Error while parsing {path}, cannot load transactions: {e}")
 
         self._statements.append(path)
-        self._initialize_transaction_id_sets()
-
-    def data(self, is_filtered: Optional[Callable[[Transaction], bool]] = None) -> List[Dict]:
-        _data = []
-        ledger = self.ledger if is_filtered is None else self.ledger.filtered(is_filtered=is_filtered)
-        for i, t in enumerate(ledger.transactions, 1):
-            transaction_data = t.dict()
-            transaction_data.update({"#": i})
-            _data.append(transaction_data)
-        return _data
-
-    def data_table_filter(self, is_filtered: Optional[Callable[[Transaction], bool]] = None
-                          ) -> List[Callable[[Dict[str, Any]], bool]]:
-        ledger = self.ledger if is_filtered is None else self.ledger.filtered(is_filtered=is_filtered)
-        filtered_ids = [t.id for t in ledger.transactions]
-        return [lambda x: x["id"] in filtered_ids]
-
-    def data_table_filter_for_operated_transactions(self) -> List[Callable[[Dict[str, Any]], bool]]:
-        t = self.data_table_filter(is_filtered=lambda t: t.id not in self.operated_transaction_ids)
-        return t
-
-    def transaction_select_deselect(self, transaction_id: TransactionId) -> SelectOperation:
-        if transaction_id in self.selected_transaction_ids:
-            self.selected_transaction_ids.remove(transaction_id)
-            return SelectOperation.deselect
-        else:
-            self.selected_transaction_ids.add(transaction_id)
-            return SelectOperation.select
-
-    def _is_transaction_not_in_operated_set(self, t: Transaction) -> bool:
-        return t.id not in self.operated_transaction_ids
+        self._initialize_bitmaps(selected_transaction_ids)
+
+    def add_statements(self, paths: List[str],
+                       statement_type: SupportedStatementTypes = SupportedStatementTypes.default(), jobs: int = 1):
+        paths = [os.path.abspath(i) for i in paths]
+        selected_transaction_ids = self.selected_transaction_ids
+        try:
+            transactions = load_transactions_from_statements(paths, statement_type.value, jobs,
+                                                             cache=self.statement_cache)
+            if self.ledger_store is not None:
+                self.ledger_store.add_transactions(transactions)
+            self._editable_ledger().add_transactions(transactions)
+        except Exception as e:
+            logger.error(f"Error while parsing {paths}, cannot load transactions: {e}")
+
+        self._statements += paths
+        self._initialize_bitmaps(selected_transaction_ids)
+
+    def open_store(self, ledger_store: SqliteLedgerStore, **query):
+        """
+        Replaces the ledger with the transactions in the store that match the query, see SqliteLedgerStore.query.
+        """
+        self.ledger_store = ledger_store
+        self._set_ledger(ledger_store.load_ledger(**query))
+
+    def open_snapshot(self, path: str, date_range: Optional[DateRange] = None):
+        """
+        Replaces the ledger with the transactions of a snapshot in the date range. The snapshot is kept open and
+        read in place, transactions and their ids are only created for the rows that are shown or operated on.
+        """
+        self._set_ledger(LedgerSnapshot(path).ledger(date_range))
+
+    def save_snapshot(self, path: str):
+        # the open snapshot may be the one being overwritten
+        save_ledger_snapshot(self._editable_ledger(), path)
+
+    def _set_ledger(self, ledger: BaseLedger):
+        previous, self.ledger = self.ledger, ledger
+        if isinstance(previous, SnapshotLedger):
+            previous.snapshot.close()
+        self._initialize_bitmaps()
+
+    def _editable_ledger(self) -> Ledger:
+        """
+        Returns the ledger to change, a ledger read from a snapshot is loaded into memory and the snapshot closed.
+        """
+        if isinstance(self.ledger, SnapshotLedger):
+            snapshot_ledger = self.ledger
+            self.ledger = Ledger().add_transactions(snapshot_ledger.transactions)
+            snapshot_ledger.snapshot.close()
+        return self.ledger
+
+    def data_columns(self) -> Dict[str, Sequence]:
+        """
+        Returns the table rows as columns taken from the ledger, the transaction fields with their ledger "position"
+        and row number "#".
+        """
+        positions = np.arange(len(self.ledger))
+        return {"#": positions + 1, **self.ledger.columns(), "position": positions}
+
+    def transaction_mask(self, is_filtered: Callable[[Transaction], bool]) -> np.ndarray:
+        """
+        Returns the bitmap over the ledger positions of the transactions that are not filtered.
+        """
+        return np.fromiter((not is_filtered(t) for t in self.ledger.transactions), dtype=bool,
+                           count=len(self.ledger))
+
+    def data_table_filter(self, is_filtered: Optional[Callable[[Transaction], bool]] = None) -> List[np.ndarray]:
+        """
+        Returns the transactions to show in the table as bitmaps over the ledger positions, to combine with `&`.
+        """
+        if is_filtered is None:
+            return [np.ones(len(self.ledger), dtype=bool)]
+        return [self.transaction_mask(is_filtered)]
+
+    def data_table_filter_for_operated_transactions(self) -> List[np.ndarray]:
+        return [self.operated.copy()]
+
+    def transaction(self, position: int) -> Transaction:
+        return self.ledger.transaction(position)
+
+    @property
+    def selected_positions(self) -> List[int]:
+        return np.flatnonzero(self.selected).tolist()
+
+    @property
+    def selected_transactions(self) -> List[Transaction]:
+        return [self.ledger.transaction(i) for i in self.selected_positions]
+
+    def is_selected(self, position: int) -> bool:
+        return bool(self.selected[position])
+
+    def transaction_select_deselect(self, position: int) -> SelectOperation:
+        self.selected[position] = not self.selected[position]
+        return SelectOperation.select if self.selected[position] else SelectOperation.deselect
+
+    @property
+    def selected_transaction_ids(self) -> Set[TransactionId]:
+        return {t.id for t in self.selected_transactions}
+
+    @property
+    def operated_transaction_ids(self) -> Set[TransactionId]:
+        return {self.ledger.transaction(i).id for i in np.flatnonzero(self.operated).tolist()}
 
     def balance_data(self) -> Tuple[List[date], List[float]]:
-        _date, _balance = [], []
-        for state in self.ledger.filtered(is_filtered=self._is_transaction_not_in_operated_set).balance_history:
-            _date.append(state.date)
-            _balance.append(state.balance)
-        return _date, _balance
-
-    def _initialize_transaction_id_sets(self):
-        for i, t in enumerate(self.ledger.transactions):
-            self.all_transaction_ids.add(t.id)
-            self.transaction_id_to_table_index[t.id] = i
-        self.operated_transaction_ids = deepcopy(self.all_transaction_ids)
+        balance_history = self.ledger.view(self.operated).balance_history
+        return list(balance_history.dates), balance_history.balances.tolist()
+
+    def expense_data(self) -> Tuple[List[str], List[float]]:
+        stats = get_category_stats_for_ledger(self.ledger.view(self.operated), Direction.debit)
+        stats = sorted(stats.items(), key=lambda x: x[1].total, reverse=True)
+        return [str(category or "uncategorised") for category, _ in stats], [i.total for _, i in stats]
+
+    def _initialize_bitmaps(self, selected_transaction_ids: Optional[Set[TransactionId]] = None):
+        # selections survive transactions being added, the selected transactions are found again by their ids since
+        # their ledger positions move
+        self.selected = np.zeros(len(self.ledger), dtype=bool)
+        if selected_transaction_ids:
+            self.selected[[i for i, transaction_id in enumerate(self.ledger.transaction_ids)
+                           if transaction_id in selected_transaction_ids]] = True
+        self.operated = np.ones(len(self.ledger), dtype=bool)
 
     def set_selected_transactions_as_filtered(self):
-        self.operated_transaction_ids = self.operated_transaction_ids.difference(self.selected_transaction_ids)
+        self.operated &= ~self.selected
 
     def set_unselected_transactions_as_filtered(self):
-        unselected_transaction_ids = self.all_transaction_ids.difference(self.selected_transaction_ids)
-        self.operated_transaction_ids = self.operated_transaction_ids.difference(unselected_transaction_ids)
+        self.operated &= self.selected
 
     def clear_selections(self):
-        self.selected_transaction_ids = set()
+        self.selected[:] = False
 
     def clear_filters(self):
-        self.operated_transaction_ids = deepcopy(self.all_transaction_ids)
+        self.operated[:] = True
 
     def clear(self):
         self.clear_filters()
@@ -0,0 +1,20 @@
+from datetime import date
+from typing import Callable, List
+
+import pytest
+from bank_statement_wizard.domain import Transaction
+
+
+@pytest.fixture
+def transactions() -> Callable[[], List[Transaction]]:
+    """
+    Returns a function creating transactions with descriptions, infos and categories, new ones on every call.
+    """
+    def _transactions() -> List[Transaction]:
+        return [
+            Transaction(date=date(2018, 1, 1), amount=-100.5, description="PUB", info="DEB", category="eating_out"),
+            Transaction(date=date(2018, 1, 2), amount=-1589.5, description="RENT", info="DD", category="regular"),
+            Transaction(date=date(2018, 1, 3), amount=2500.0, description="SALÁRIO", info="FPI"),
+            Transaction(date=date(2018, 1, 3), amount=37.0)]
+
+    return _transactions
@@ -0,0 +1,109 @@
+from random import Random
+from datetime import date
+
+import pytest
+from bank_statement_wizard.domain import Ledger, Transaction, Direction, SimpleExpenseCategoryMatcher, CategoryStats, \
+    get_category_stats_for_ledger, get_expense_stats_for_transaction_groups
+from bank_statement_wizard.domain.analysis import get_match_score_for_category
+
+KEYWORDS = ["pub", "public", "market", "corner shop", "shop", "pizza", "tax", "taxi", "rent", "parent", "bill"]
+
+
+def match_category_by_scoring_every_pattern(expense_category_data, expense: Transaction) -> str:
+    scores = {category: get_match_score_for_category(category_data, expense)
+              for category, category_data in expense_category_data.items()}
+    category = max(scores.items(), key=lambda x: x[1])[0]
+    return category if scores[category] >= 1e-3 else "unidentified"
+
+
+def test_match_category_to_expense():
+    random = Random(1)
+    for _ in range(100):
+        expense_category_data = {f"category_{i}": random.sample(KEYWORDS, random.randint(1, 4))
+                                 for i in range(random.randint(1, 6))}
+        expense_category_data["regex"] = ["sal.ry"] if random.random() < 0.2 else ["salary"]
+        matcher = SimpleExpenseCategoryMatcher(expense_category_data)
+
+        for _ in range(20):
+            description = " ".join(random.choice(KEYWORDS + ["SALARY", "Pub", "TAXI!", "-"])
+                                   for _ in range(random.randint(0, 4)))
+            expense = Transaction(date=date(2018, 1, 1), amount=-1.0, description=description)
+            assert matcher.match_category_to_expense(expense) == \
+                match_category_by_scoring_every_pattern(expense_category_data, expense)
+            assert expense.category == match_category_by_scoring_every_pattern(expense_category_data, expense)
+
+
+def test_match_bulk_cache():
+    matcher = SimpleExpenseCategoryMatcher({"eating_out": ["pub"], "groceries": ["market"]}, cache_size=2)
+    expenses = [Transaction(date=date(2018, 1, i), amount=-1.0, description=d)
+                for i, d in enumerate(["RANDOM PUB", "random-pub", "MARKET", "RANDOM PUB", "BANK"], 1)]
+
+    assert matcher.match_bulk(expenses) == ["eating_out", "eating_out", "groceries", "eating_out", "unidentified"]
+    info = matcher.cache_info()
+    assert (info.hits, info.misses, info.size) == (2, 3, 2)
+
+    matcher.update_rules({"regular": ["random"], "eating_out": ["pub"]})
+    assert matcher.match_category_to_expense(expenses[0]) == "regular"
+    assert matcher.cache_info().misses == 4
+
+
+def test_match_bulk_in_parallel():
+    random = Random(2)
+    expense_category_data = {"eating_out": ["pub", "pizza"], "groceries": ["market", "corner shop"],
+                             "regular": ["rent", "tax"]}
+    descriptions = [" ".join(random.choice(KEYWORDS + ["xx"]) for _ in range(3)) for _ in range(50)]
+    expenses = [Transaction(date=date(2018, 1, 1), amount=-1.0, description=random.choice(descriptions))
+                for _ in range(500)]
+
+    expected = SimpleExpenseCategoryMatcher(expense_category_data).match_bulk(expenses)
+    matcher = SimpleExpenseCategoryMatcher(expense_category_data)
+    assert matcher.match_bulk(expenses, jobs=2, chunk_size=7) == expected
+    assert [i.category for i in expenses] == expected
+    assert matcher.cache_info().misses == len(set(descriptions))
+    assert matcher.match_bulk(expenses, jobs=2) == expected
+    assert matcher.cache_info().misses == len(set(descriptions))
+
+
+def test_category_stats():
+    ledger = Ledger().add_transactions([
+        Transaction(date=date(2018, 1, 1), amount=-100.0, category="eating_out"),
+        Transaction(date=date(2018, 1, 2), amount=-300.0, category="regular"),
+        Transaction(date=date(2018, 1, 3), amount=-50.0, category="eating_out"),
+        Transaction(date=date(2018, 1, 3), amount=2500.0, category="regular"),
+        Transaction(date=date(2018, 1, 4), amount=-50.0),
+    ])
+
+    stats = get_category_stats_for_ledger(ledger, Direction.debit)
+    assert stats == {"eating_out": CategoryStats(total=150.0, count=2, mean=-75.0, share=0.3),
+                     "regular": CategoryStats(total=300.0, count=1, mean=-300.0, share=0.6),
+                     None: CategoryStats(total=50.0, count=1, mean=-50.0, share=0.1)}
+    categorised = get_category_stats_for_ledger(ledger.filtered(lambda t: t.category is None), Direction.debit)
+    assert list(categorised) == ["eating_out", "regular"]
+    assert abs(categorised["eating_out"].share - 1 / 3) < 1e-9
+
+    grouped = ledger.transactions_by_category(Direction.debit)
+    assert get_expense_stats_for_transaction_groups(grouped, 450.0) == {"eating_out": (150.0, 1 / 3),
+                                                                          "regular": (300.0, 2 / 3)}
+    with pytest.raises(AssertionError):  # the uncategorised debit is left out, the shares add up to 0.9
+        get_expense_stats_for_transaction_groups(grouped, ledger.debit_balance)
+    with pytest.raises(AssertionError):
+        get_expense_stats_for_transaction_groups(grouped, 300.0)
+
+
+def test_category_stats_with_mixed_signs():
+    ledger = Ledger().add_transactions([
+        Transaction(date=date(2018, 1, 1), amount=-100.0, category="eating_out"),
+        Transaction(date=date(2018, 1, 2), amount=-300.0, category="regular"),
+        Transaction(date=date(2018, 1, 3), amount=2500.0, category="regular"),
+    ])
+
+    stats = get_category_stats_for_ledger(ledger)
+    assert stats == {"eating_out": CategoryStats(total=100.0, count=1, mean=-100.0, share=100.0 / 2300.0),
+                     "regular": CategoryStats(total=2200.0, count=2, mean=1100.0, share=2200.0 / 2300.0)}
+    assert abs(sum(i.share for i in stats.values()) - 1.0) < 1e-9
+
+    cancelled = get_category_stats_for_ledger(Ledger().add_transactions([
+        Transaction(date=date(2018, 1, 1), amount=-100.0, category="transfer"),
+        Transaction(date=date(2018, 1, 2), amount=100.0, category="transfer"),
+    ]))
+    assert cancelled == {"transfer": CategoryStats(total=0.0, count=2, mean=0.0, share=0.0)}
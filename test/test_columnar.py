@@ -0,0 +1,90 @@
+from random import Random
+
+import numpy as np
+import pytest
+
+try:
+    from bank_statement_wizard.thirdparty.panwid.datatable.columnar import ColumnarDataFrame
+except AttributeError:  # the vendored panwid does not support urwid 4
+    pytest.skip("the data table needs urwid < 4", allow_module_level=True)
+
+
+def sort_key(x):
+    return x is None, x
+
+
+def test_matches_raccoon():
+    rc = pytest.importorskip("raccoon")
+    random = Random(1)
+    for _ in range(200):
+        n = random.randint(0, 30)
+        index = random.sample(range(1000), n)
+        columns = {"a": [random.choice([1, 2, 3, None]) for _ in range(n)], "b": [random.random() for _ in range(n)],
+                   "c": [random.choice(["x", "y", None]) for _ in range(n)],
+                   "d": [random.choice([True, False]) for _ in range(n)]}
+        expected = rc.DataFrame(data={k: list(v) for k, v in columns.items()}, columns=list(columns),
+                                index=list(index), sort=False)
+        frame = ColumnarDataFrame(data=columns, columns=list(columns), index=index)
+
+        for _ in range(10):
+            operation = random.choice(["sort", "sort_reversed", "delete", "set", "set_column", "set_cell", "append",
+                                       "add_row"])
+            if operation.startswith("sort"):
+                column, reverse = random.choice(list(columns)), operation == "sort_reversed"
+                expected.sort_columns(column, key=sort_key, reverse=reverse)
+                frame.sort_columns(column, reverse=reverse)
+            elif operation == "delete" and len(expected):
+                indexes = random.sample(expected.index, random.randint(1, len(expected)))
+                expected.delete_rows(indexes)
+                frame.delete_rows(indexes)
+            elif operation == "set":
+                indexes = list(dict.fromkeys(random.sample(range(1000), 3) +
+                                             random.sample(expected.index, min(2, len(expected)))))
+                values = [random.random() for _ in indexes]
+                expected.set(indexes, "b", values)
+                frame.set(indexes, "b", values)
+            elif operation == "set_column":
+                expected["d"] = True
+                frame["d"] = True
+            elif operation == "set_cell" and len(expected):
+                index = random.choice(expected.index)
+                expected[index, "a"] = 7
+                frame[index, "a"] = 7
+            elif operation == "append":
+                indexes = [i for i in random.sample(range(1000, 1100), 3) if i not in expected.index]
+                expected.append(rc.DataFrame(data={"a": [5] * len(indexes)}, columns=["a"], index=indexes,
+                                             sort=False))
+                frame.append(ColumnarDataFrame(data={"a": [5] * len(indexes)}, columns=["a"], index=indexes))
+            elif operation == "add_row":
+                index = random.randint(1100, 1200)
+                if index not in expected.index:
+                    row = {"a": 4, "b": 0.5, "c": "z", "d": False}
+                    expected.set(index, values=row)
+                    frame.set(index, values=row)
+
+            assert frame.index == expected.index, operation
+            assert frame.to_dict() == expected.to_dict(), operation
+            assert list(frame.iterrows()) == list(expected.iterrows())
+            for i in expected.index:
+                assert frame.get_columns(i, as_dict=True) == expected.get_columns(i, as_dict=True)
+
+
+def test_appending_keeps_column_types():
+    frame = ColumnarDataFrame(columns=["amount", "count", "name"])
+    for n in range(1000):
+        frame.set(n, values={"amount": n / 2, "count": n, "name": str(n)})
+    assert [frame.column_array(c).dtype for c in frame.columns] == [np.float64, np.int64, object]
+    assert len(frame.column_array("amount")) == 1000
+    assert len(frame._data["amount"]) < 2000  # grown geometrically, not one row at a time
+
+    frame.set_cell(1000, "amount", 0.25)
+    assert frame.column_array("amount").dtype == np.float64
+    assert frame.column_array("count").dtype == object  # only the column missing a value changes type
+    assert frame.get(1000, "count") is None
+
+    frame.sort_columns("amount", reverse=True)
+    assert frame.index[:3] == [999, 998, 997]
+    frame.delete_rows([999])
+    frame.set(1001, values={"amount": 1, "count": 1, "name": "1001"})
+    assert frame.column_array("amount").dtype == np.float64 and frame.get(1001, "amount") == 1.0
+    assert frame.index[-3:] == [1000, 0, 1001] and len(frame) == 1001
@@ -0,0 +1,151 @@
+import pytest
+
+try:
+    import urwid
+    from bank_statement_wizard.thirdparty.panwid.datatable import DataTable, DataTableColumn
+except AttributeError:  # the vendored panwid does not support urwid 4
+    pytest.skip("the data table needs urwid < 4", allow_module_level=True)
+
+
+SIZE = (80,)
+
+
+def make_table(n: int = 300, **kwargs):
+    data = {"id": list(range(n)), "value": [i * 1.5 for i in range(n)], "name": [f"row {i % 7}" for i in range(n)]}
+    table = DataTable(columns=[DataTableColumn("value"), DataTableColumn("name")], data=data,
+                      index_column_name="id", **kwargs)
+    box = urwid.BoxAdapter(table, 12)
+    box.render(SIZE, focus=True)
+    return table, box
+
+
+def scroll(box, key: str, times: int):
+    for _ in range(times):
+        box.keypress(SIZE, key)
+        box.render(SIZE, focus=True)
+
+
+def test_row_widgets_are_bounded_and_recycled():
+    table, box = make_table(overscan=5)
+    created = []
+    render_item = table.render_item
+    table.render_item = lambda index: created.append(index) or render_item(index)
+
+    scroll(box, "page down", 20)
+    assert table.focus_position > 100
+    assert len(table.rendered_rows) <= table.row_cache_size
+    assert len(created) <= table.row_cache_size
+    assert {r.index for r in table.rendered_rows} == set(table._row_cache)
+    assert all(r.data["value"] == r.index * 1.5 for r in table.rendered_rows)
+    assert table.selection.index == table.focus_position
+
+
+def test_rebind_only_rebuilds_changed_cells():
+    table, box = make_table()
+    row = table.get_row(0)
+    value_cell, name_cell = [c for c in row.data_cells if c.column.name in ("value", "name")]
+    name_contents = name_cell.contents
+
+    row.rebind(7)  # same name, another value
+    assert row.index == 7 and row.data["value"] == 10.5
+    assert name_cell.contents is name_contents
+    assert value_cell.contents_value == 10.5
+    row.rebind(8)
+    assert name_cell.contents is not name_contents and name_cell.contents_value == "row 1"
+
+
+def test_details_survive_recycling():
+    table, box = make_table(overscan=2, detail_fn=lambda data: urwid.Text(f"details of {data['id']}"))
+    table.get_row(0).open_details()
+    assert table.data_frame.get(0, "_details")["open"]
+
+    scroll(box, "page down", 10)
+    assert 0 not in table._row_cache
+    assert any(len(r.pile.contents) == 1 for r in table.rendered_rows)
+    scroll(box, "page up", 10)
+    row = table.get_row(0)
+    assert len(row.pile.contents) == 2 and row.details_open
+    assert all(len(r.pile.contents) == 1 for r in table.rendered_rows if r.index != 0)
+
+
+def test_filters_combine_bitmaps_and_predicates():
+    table, box = make_table(20)
+    even = table.index_bitmap(range(0, 20, 2))
+    assert even.tolist() == [i % 2 == 0 for i in range(20)]
+    assert table.index_bitmap([3, 99, 1], [True, True, False]).tolist() == [i == 3 for i in range(20)]
+
+    table.apply_filters([even, lambda row: row["value"] > 10])
+    assert table.filtered_rows.tolist() == list(range(8, 20, 2))
+    assert len(table) == 6 and table[0].index == 8
+    with pytest.raises(ValueError):
+        table.apply_filters([even[:5]])
+
+    table.sort_by_column("value", toggle=True)
+    table.sort_by_column("value", toggle=True)  # descending
+    assert [table[p].index for p in range(len(table))] == list(range(18, 7, -2))
+    table.clear_filters()
+    assert len(table) == 20
+
+
+def test_update_columns():
+    from bank_statement_wizard.thirdparty.panwid.datatable.dataframe import DataTableDataFrame
+
+    frame = DataTableDataFrame(columns=["amount", "name"], index_name="id")
+    assert frame.update_columns({"id": [1, 2, 3], "amount": [1.0, 2.0, 3.0], "name": ["a", "b", "c"]}) == [1, 2, 3]
+    frame.set(2, "_details", {"open": True, "disabled": False})
+    frame.update_columns({"id": [2, 3, 4], "amount": [2.5, 3.5, 4.5], "name": ["b", "c", "d"]})
+
+    assert frame.index == [2, 3, 4]
+    assert frame.get(2, "_details")["open"] and not frame.get(4, "_details")["open"]
+    assert frame.get(4, "_cls") is not None and frame.get(2, "_cls") is frame.get(4, "_cls")
+    assert frame.column_array("amount").dtype == float and frame.get(3, "amount") == 3.5
+
+
+def test_update_columns_after_sort():
+    from bank_statement_wizard.thirdparty.panwid.datatable.dataframe import DataTableDataFrame
+
+    frame = DataTableDataFrame(columns=["amount", "name"], index_name="id")
+    frame.update_columns({"id": [1, 2, 3], "amount": [1.0, 2.0, 3.0], "name": ["a", "b", "c"]})
+    frame.sort_columns("amount", reverse=True)
+    frame.update_columns({"id": [4, 1, 2, 3], "amount": [4.5, 1.5, 2.5, 3.5], "name": ["d", "a", "b", "c"]})
+
+    assert frame.index == [3, 2, 1, 4]
+    assert frame.column_array("amount").dtype == float
+    assert frame.get([3, 2, 1, 4], "amount", as_list=True) == [3.5, 2.5, 1.5, 4.5]
+    assert frame.get(4, "name") == "d" and frame.get(4, "_cls") is frame.get(1, "_cls")
+
+
+def test_load_columns():
+    table, box = make_table(10, detail_fn=lambda data: urwid.Text(str(data["id"])))
+    table.get_row(4).open_details()
+    table.focus_position = 4
+    table.load_columns({"id": [2, 3, 4, 10], "value": [0.0, 1.0, 2.0, 3.0], "name": ["x"] * 4})
+    box.render(SIZE, focus=True)
+
+    assert table.data_frame.index == [2, 3, 4, 10] and len(table) == 4
+    assert table.selection.index == 4 and table.selection.details_open
+    assert table.data_frame.column_array("value").dtype == float
+    assert table.get_row(10).data["value"] == 3.0 and table.get_row(10).data.id == 10
+
+
+def test_index_positions_follow_the_data_frame():
+    table, box = make_table(30)
+
+    def assert_index_positions():
+        assert table._index_positions == {i: p for p, i in enumerate(table.data_frame.index)}
+        assert all(table.position_to_index(table.index_to_position(i)) == i for i in table.data_frame.index)
+
+    assert_index_positions()
+    table.sort_by_column("name")
+    assert_index_positions()
+    table.apply_filters([lambda row: row["id"] % 3 == 0])
+    assert_index_positions()
+    assert [table.index_to_focus_position(table[p].index) for p in range(len(table))] == list(range(10))
+    table.delete_rows([0, 1, 2, 3])
+    assert_index_positions()
+    assert sorted(table.position_to_index(p) for p in table.filtered_rows) == list(range(6, 30, 3))
+    table.load_columns({"id": list(range(25, 35)), "value": [1.0] * 10, "name": ["x"] * 10})
+    assert_index_positions()
+    assert 0 not in table._index_positions and table.index_to_position(34) == table.data_frame.index.index(34)
+    table.refresh()
+    assert_index_positions()
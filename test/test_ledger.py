@@ -1,7 +1,12 @@
 from uuid import *
+from random import Random
 from typing import List
 from datetime import date
-from bank_statement_wizard.domain import Ledger, Transaction, DateRange, DateRangeElement, Inclusivity
+
+import numpy as np
+import pytest
+from bank_statement_wizard.domain import BaseLedger, Ledger, LedgerState, Transaction, DateRange, DateRangeElement, \
+    Inclusivity, Direction, Period, Aggregation, group_transactions_using_category
 
 
 def transactions() -> List[Transaction]:
@@ -52,3 +57,176 @@ def test_transaction_id():
     assert Transaction(date=date(2018, 1, 1), amount=-100.5).id == uuid5(
         Transaction._namespace, f"2018-01-01,None,-100.50,None"
     )
+
+
+def test_transaction_id_is_lazy():
+    transaction = Transaction(date=date(2018, 1, 3), amount=37.0, description="PUB", info="DEB")
+    assert not hasattr(transaction, "__dict__")
+    assert transaction._id is None
+    assert transaction.id == uuid5(Transaction._namespace, "2018-01-03,PUB,37.00,DEB")
+
+    _transactions = transactions()
+    Transaction.generate_ids(_transactions)
+    assert [t._id for t in _transactions] == [t.id for t in transactions()]
+    assert len({*_transactions, *transactions()}) == len(_transactions)
+
+
+def test_add_transactions_incrementally():
+    random = Random(42)
+    batches = [[Transaction(date=date(2018, 1, random.randint(1, 28)), amount=float(random.randint(-500, 500)),
+                            description=str(random.randint(0, 60))) for _ in range(random.randint(1, 20))]
+               for _ in range(20)]
+
+    ledger = Ledger()
+    all_transactions = []
+    for batch in batches:
+        ledger.add_transactions(batch)
+        all_transactions += batch
+
+        expected_transactions = sorted(dict.fromkeys(all_transactions), key=lambda t: t.date)
+        expected = Ledger()
+        expected.transactions = expected_transactions
+        expected._compute_balance_history()
+
+        assert [t.id for t in expected.transactions] == [t.id for t in ledger.transactions]
+        assert [(s.date, s.balance) for s in expected.balance_history] == \
+            [(s.date, s.balance) for s in ledger.balance_history]
+
+
+def test_balance_history():
+    random = Random(7)
+    _transactions = [Transaction(date=date(2018, 1, random.randint(1, 28)), amount=random.uniform(-100, 100))
+                     for _ in range(50)]
+    ledger = Ledger().add_transactions(_transactions)
+
+    states, state = [], LedgerState()
+    for t in ledger.transactions:
+        state = state.apply(t)
+        states.append((state.date, state.credit_balance, state.debit_balance, state.balance))
+
+    assert len(ledger.balance_history) == len(states)
+    assert [(s.date, s.credit_balance, s.debit_balance, s.balance) for s in ledger.balance_history] == states
+    assert ledger.balance_history.balances.tolist() == [i[-1] for i in states]
+    assert ledger.balance_history[-1].balance == ledger.balance == states[-1][-1]
+
+
+def test_filtered():
+    ledger = Ledger().add_transactions(transactions())
+    view = ledger.filtered(is_filtered=lambda t: t.amount == 2500.0)
+    expected = Ledger().add_transactions([t for t in transactions() if t.amount != 2500.0])
+
+    assert len(view) == len(expected) == 3
+    assert all(a is b for a, b in zip(view.transactions, [ledger.transactions[i] for i in (0, 1, 3)]))
+    assert [t.id for t in view.transactions] == [t.id for t in expected.transactions]
+    assert [(s.date, s.balance) for s in view.balance_history] == \
+        [(s.date, s.balance) for s in expected.balance_history]
+    assert str(view) == str(expected)
+    assert view.date_range == expected.date_range
+    assert view.transactions is view.transactions
+    assert (view.first_transaction, view.transaction(1), view.last_transaction) == tuple(expected.transactions)
+
+    nested = view.filtered(is_filtered=lambda t: t.amount > 0)
+    assert [t.id for t in nested.transactions] == [t.id for t in expected.debit_transactions]
+    assert abs(nested.debit_balance - expected.debit_balance) < 1e-9
+
+    ledger.add_transaction(Transaction(date=date(2018, 1, 4), amount=1.0))
+    with pytest.raises(ValueError):
+        view.transactions
+
+
+def test_sliced_and_balance_at():
+    ledger = Ledger().add_transactions(transactions())
+
+    def date_range(start: int, start_inclusivity: Inclusivity, end: int, end_inclusivity: Inclusivity) -> DateRange:
+        return DateRange(start=DateRangeElement(date=date(2018, 1, start), inclusivity=start_inclusivity),
+                         end=DateRangeElement(date=date(2018, 1, end), inclusivity=end_inclusivity))
+
+    closed, open_ = Inclusivity.closed, Inclusivity.open
+    assert len(ledger.sliced(date_range(1, closed, 3, closed))) == 4
+    assert len(ledger.sliced(date_range(1, open_, 3, closed))) == 3
+    assert len(ledger.sliced(date_range(1, closed, 3, open_))) == 2
+    assert len(ledger.sliced(date_range(1, open_, 3, open_))) == 1
+    assert len(ledger.sliced(date_range(3, open_, 1, open_))) == 0
+    assert abs(ledger.sliced(date_range(2, closed, 3, closed)).balance - 947.5) < 1e-9
+    assert len(ledger.filtered(lambda t: t.amount > 0).sliced(date_range(2, closed, 3, closed))) == 1
+
+    assert ledger.balance_at(date(2017, 12, 31)) == 0.0
+    assert abs(ledger.balance_at(date(2018, 1, 2)) + 1690.0) < 1e-9
+    assert abs(ledger.state_at(date(2019, 1, 1)).credit_balance - 2537.0) < 1e-9
+    assert ledger.state_at(date(2019, 1, 1)).date == date(2019, 1, 1)
+    with pytest.raises(TypeError):
+        BaseLedger()
+
+
+def test_indexes():
+    random = Random(3)
+    ledger = Ledger()
+    for _ in range(10):
+        ledger.add_transactions([Transaction(date=date(2018, 1, random.randint(1, 28)),
+                                             amount=float(random.randint(-5, 5)), info=random.choice("ABC"),
+                                             category=random.choice(["food", "rent", None]))
+                                 for _ in range(random.randint(1, 10))])
+        assert ledger.debit_transactions == [t for t in ledger.transactions if t.amount < 0]
+        assert ledger.credit_transactions == [t for t in ledger.transactions if t.amount > 0]
+        assert ledger.transactions_of_info("B") == [t for t in ledger.transactions if t.info == "B"]
+        assert ledger.transactions_of_category("food") == [t for t in ledger.transactions if t.category == "food"]
+
+    ledger.transactions[-1].category = "travel"
+    assert ledger.transactions_of_category("travel") == [ledger.transactions[-1]]
+    assert ledger.transactions_by_category(Direction.debit) == \
+        group_transactions_using_category(ledger.debit_transactions)
+    assert ledger.transactions_by_category() == group_transactions_using_category(ledger.transactions)
+
+
+def test_category_index_is_incremental():
+    ledger = Ledger().add_transactions([Transaction(date=date(2018, 1, 1), amount=-1.0, category="food"),
+                                        Transaction(date=date(2018, 1, 3), amount=-2.0, category="rent")])
+    other = Ledger().add_transactions([Transaction(date=date(2018, 1, 1), amount=-3.0, category="food")])
+    index = ledger._get_category_index()
+
+    ledger.add_transaction(Transaction(date=date(2018, 1, 2), amount=-4.0, category="food"))
+    other.transactions[0].category = "travel"
+    assert ledger._get_category_index() is index
+    assert ledger.positions_of_category("food") == [0, 1]
+    assert ledger.positions_of_category("rent") == [2]
+
+    shared = other.transactions[0]
+    ledger.add_transaction(shared)
+    shared.category = "rent"
+    assert ledger._get_category_index() is not index
+    assert ledger.positions_of_category("rent") == [1, 3]
+    assert other.categories == ["rent"]
+
+
+def test_pivot():
+    random = Random(5)
+
+    def random_transactions():
+        return [Transaction(date=date(random.randint(2017, 2019), random.randint(1, 12), random.randint(1, 28)),
+                            amount=float(random.randint(-50, 50)), description=str(random.random()),
+                            category=random.choice(["food", "rent", None]))
+                for _ in range(random.randint(1, 30))]
+
+    ledger = Ledger().add_transactions(random_transactions())
+    pivots = {(period, direction): ledger.pivot(period, direction)
+              for period in Period for direction in (None, Direction.debit)}
+    for _ in range(5):
+        ledger.add_transactions(random_transactions())
+
+    for (period, direction), pivot in pivots.items():
+        transactions = ledger.debit_transactions if direction is Direction.debit else ledger.transactions
+        expected = ledger.pivot(period, direction)
+        assert pivot.periods == expected.periods
+        assert sorted(pivot.categories, key=str) == sorted(expected.categories, key=str)
+        rows = [pivot.categories.index(c) for c in expected.categories]
+        for aggregation in Aggregation:
+            assert np.allclose(pivot.values(aggregation)[rows], expected.values(aggregation), equal_nan=True)
+
+        sums = pivot.to_dict(Aggregation.sum)
+        for n, start in enumerate(pivot.periods):
+            end = pivot.periods[n + 1] if n + 1 < len(pivot.periods) else date.max
+            for category in pivot.categories:
+                amounts = [t.amount for t in transactions if t.category == category and start <= t.date < end]
+                assert sums[category][start] == pytest.approx(sum(amounts))
+                if period is Period.weekly:
+                    assert start.weekday() == 0
@@ -0,0 +1,53 @@
+import os
+
+import pytest
+from bank_statement_wizard.domain import Ledger, save_ledger_snapshot
+
+try:
+    from bank_statement_wizard.ui.model import BankStatementWizardModel
+except AttributeError:  # the vendored panwid does not support urwid 4
+    pytest.skip("the ui needs urwid < 4", allow_module_level=True)
+
+
+def test_model_reads_snapshot_lazily(tmp_path, transactions):
+    path = os.path.join(str(tmp_path), "ledger.snapshot")
+    save_ledger_snapshot(Ledger().add_transactions(transactions()), path)
+
+    model = BankStatementWizardModel()
+    model.open_snapshot(path)
+    assert list(model.data_columns()["description"]) == ["PUB", "RENT", "SALÁRIO", "None"]
+    assert model.data_columns()["position"].tolist() == [0, 1, 2, 3]
+    model.transaction_select_deselect(1)
+    assert model.is_selected(1) and [t.description for t in model.selected_transactions] == ["RENT"]
+    assert model.expense_data() == (["regular", "eating_out"], [1589.5, 100.5])
+    assert model.ledger._transactions is None
+
+    selected_transaction_ids = model.selected_transaction_ids
+    model.save_snapshot(path)
+    assert isinstance(model.ledger, Ledger) and model.selected_transaction_ids == selected_transaction_ids
+
+
+def test_selections_move_with_added_transactions(transactions):
+    model = BankStatementWizardModel()
+    model.ledger.add_transactions(transactions()[2:])
+    model._initialize_bitmaps()
+    model.transaction_select_deselect(0)
+    selected_transaction_ids = model.selected_transaction_ids
+
+    model.ledger.add_transactions(transactions()[:2])
+    model._initialize_bitmaps(selected_transaction_ids)
+    assert model.selected_positions == [2] and model.selected_transaction_ids == selected_transaction_ids
+
+
+def test_data_table_filters(transactions):
+    model = BankStatementWizardModel()
+    model.ledger.add_transactions(transactions())
+    model._initialize_bitmaps()
+    model.transaction_select_deselect(0)
+    model.set_selected_transactions_as_filtered()
+
+    assert model.data_table_filter()[0].tolist() == [True, True, True, True]
+    assert model.data_table_filter(lambda t: t.amount > 0)[0].tolist() == [True, True, False, False]
+    assert model.data_table_filter_for_operated_transactions()[0].tolist() == [False, True, True, True]
+    model.data_table_filter_for_operated_transactions()[0][:] = False
+    assert model.operated.tolist() == [False, True, True, True]
@@ -0,0 +1,197 @@
+import os
+from types import GeneratorType
+from datetime import date, datetime
+
+import pytest
+import numpy as np
+
+from bank_statement_wizard.domain import Ledger
+from bank_statement_wizard.parsing.cache import StatementCache
+from bank_statement_wizard.parsing.columnar import CategoricalColumn, build_columns, concatenate_columns
+from bank_statement_wizard.parsing.parsing_utility import parse_csv_using_schema, get_date_parser, \
+    split_file_into_line_aligned_ranges, compile_line_parser, get_line_parser_from_ordered_dict
+from bank_statement_wizard.parsing.lloyds_bank_uk import get_current_account_statement_schema, \
+    get_current_account_statement_columns, current_account_statement_values_to_transaction
+from bank_statement_wizard.parsing.support import iter_transactions_from_statement, get_loader, \
+    load_transactions_from_statements, SupportedStatementTypes
+
+SAMPLE_DEBIT_STATEMENT = os.path.join(os.path.dirname(__file__), "..", "data", "sample_debit_statement.csv")
+DEBIT = SupportedStatementTypes.LloydsBankUKCurrentAccountStatement.value
+
+
+def test_iter_transactions_from_statement():
+    transactions = iter_transactions_from_statement(SAMPLE_DEBIT_STATEMENT, DEBIT)
+    assert isinstance(transactions, GeneratorType)
+
+    first = next(transactions)
+    assert first.date == date(2016, 1, 30)
+    assert first.description == "RANDOM PUB"
+    assert abs(first.amount + 8.5) < 1e-6
+
+    assert [first] + list(transactions) == get_loader(DEBIT)(SAMPLE_DEBIT_STATEMENT)
+
+
+def test_ledger_add_transactions_in_batches():
+    expected = Ledger().add_transactions(get_loader(DEBIT)(SAMPLE_DEBIT_STATEMENT))
+    ledger = Ledger().add_transactions_in_batches(
+        iter_transactions_from_statement(SAMPLE_DEBIT_STATEMENT, DEBIT), batch_size=3)
+
+    assert len(expected) == len(ledger)
+    assert abs(expected.balance - ledger.balance) < 1e-6
+    assert abs(expected.debit_balance - ledger.debit_balance) < 1e-6
+
+
+def test_parse_csv_using_schema_columns():
+    columns = parse_csv_using_schema(SAMPLE_DEBIT_STATEMENT, get_current_account_statement_schema(),
+                                     output_data_type="dict")
+    entries = parse_csv_using_schema(SAMPLE_DEBIT_STATEMENT, get_current_account_statement_schema())
+
+    dates = columns["transaction_date"]
+    assert dates.dtype == np.dtype("datetime64[D]")
+    assert dates.tolist() == [i["transaction_date"] for i in entries]
+
+    debit = columns["debit_amount"]
+    assert debit.dtype == np.float64
+    assert [None if np.isnan(i) else i for i in debit.tolist()] == [i["debit_amount"] for i in entries]
+
+    descriptions = columns["transaction_description"]
+    assert isinstance(descriptions, CategoricalColumn)
+    assert descriptions.values() == [i["transaction_description"] for i in entries]
+    assert len(descriptions.categories) == len(set(descriptions.values()))
+
+
+def test_parse_csv_using_schema_columns_with_short_line(tmp_path):
+    path = tmp_path / "statement.csv"
+    path.write_text("Transaction Date,Transaction Type,Sort Code,Account Number,Transaction Description,"
+                    "Debit Amount,Credit Amount,Balance,\n"
+                    "30/01/2016,DEB,'00-00-00,99999999,RANDOM PUB,8.5,,4417.22\n"
+                    "27/01/2016,FPI,'00-00-00,99999999,SALARY PAYMENT,\n"
+                    "25/01/2016,DEB,'00-00-00,99999999,INTER-GALACTIC MARKET,25,,925.72\n")
+
+    columns = parse_csv_using_schema(str(path), get_current_account_statement_schema(), output_data_type="dict")
+    entries = parse_csv_using_schema(str(path), get_current_account_statement_schema())
+    assert "balance" not in entries[1]
+    assert all(len(i) == 3 for i in columns.values())
+    assert [None if np.isnan(i) else i for i in columns["debit_amount"].tolist()] == [8.5, None, 25.0]
+    assert [None if np.isnan(i) else i for i in columns["balance"].tolist()] == [4417.22, None, 925.72]
+    assert columns["transaction_description"].values() == [i["transaction_description"] for i in entries]
+
+
+def test_build_and_concatenate_columns_with_different_keys():
+    first = build_columns([{"amount": 1.0}, {"amount": 2.0, "description": "PUB"}, {}])
+    assert first["amount"].tolist()[:2] == [1.0, 2.0] and np.isnan(first["amount"][2])
+    assert first["description"].values() == [None, "PUB", None]
+
+    second = build_columns([{"date": date(2016, 1, 1), "amount": 3.0}])
+    columns = concatenate_columns([second, first])
+    assert list(columns) == ["date", "amount", "description"]
+    assert columns["date"].tolist() == [date(2016, 1, 1), None, None, None]
+    assert columns["amount"].tolist()[:3] == [3.0, 1.0, 2.0]
+    assert columns["description"].values() == [None, None, "PUB", None]
+
+
+def test_get_date_parser():
+    for date_format, value in (("%d/%m/%Y", "30/01/2016"), ("%Y-%m-%d", "2016-01-30"),
+                               ("%d/%m/%Y", "3/1/2016"), ("%b %d %Y", "Jan 30 2016")):
+        parser = get_date_parser(date_format)
+        assert parser(value) == datetime.strptime(value, date_format).date()
+        assert parser(value) == get_date_parser(date_format, cache_size=None)(value)
+
+    parser = get_date_parser("%d/%m/%Y")
+    for value in ("32/01/2016", "30/13/2016", "3a/01/2016"):
+        with pytest.raises(ValueError):
+            parser(value)
+
+
+def split_sample_debit_statement(directory, number_of_statements: int):
+    with open(SAMPLE_DEBIT_STATEMENT) as handle:
+        header, *lines = handle.read().splitlines()
+    paths = []
+    for i in range(number_of_statements):
+        path = os.path.join(str(directory), f"statement_{i}.csv")
+        with open(path, "w") as handle:
+            # consecutive statements overlap by one line
+            handle.write("\n".join([header] + lines[max(0, 4 * i - 1):4 * (i + 1)]))
+        paths.append(path)
+    return paths
+
+
+def test_load_transactions_from_statements_in_parallel(tmp_path):
+    paths = split_sample_debit_statement(tmp_path, number_of_statements=4)
+
+    sequential = Ledger()
+    for path in paths:
+        sequential.add_transactions(get_loader(DEBIT)(path))
+    parallel = Ledger().add_transactions(load_transactions_from_statements(paths, DEBIT, jobs=2))
+
+    assert [t.id for t in sequential.transactions] == [t.id for t in parallel.transactions]
+    assert [s.balance for s in sequential.balance_history] == [s.balance for s in parallel.balance_history]
+
+
+def test_split_file_into_line_aligned_ranges():
+    with open(SAMPLE_DEBIT_STATEMENT, "rb") as handle:
+        content = handle.read()
+
+    for number_of_ranges in (1, 2, 3, 7, 100):
+        ranges = split_file_into_line_aligned_ranges(SAMPLE_DEBIT_STATEMENT, number_of_ranges)
+        assert ranges[0][0] == 0 and ranges[-1][1] == len(content)
+        assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+        assert all(content[end - 1:end] == b"\n" for _, end in ranges[:-1])
+
+
+def test_parse_csv_using_schema_in_parallel():
+    sequential = parse_csv_using_schema(SAMPLE_DEBIT_STATEMENT, get_current_account_statement_schema())
+    assert sequential == parse_csv_using_schema(SAMPLE_DEBIT_STATEMENT, get_current_account_statement_schema, jobs=3)
+
+    columns = parse_csv_using_schema(SAMPLE_DEBIT_STATEMENT, get_current_account_statement_schema,
+                                     output_data_type="dict", jobs=3)
+    assert columns["transaction_date"].tolist() == [i["transaction_date"] for i in sequential]
+    assert columns["transaction_description"].values() == [i["transaction_description"] for i in sequential]
+
+    with pytest.raises(ValueError):
+        parse_csv_using_schema(SAMPLE_DEBIT_STATEMENT, get_current_account_statement_schema(), jobs=3)
+
+
+def test_statement_cache(tmp_path):
+    paths = split_sample_debit_statement(tmp_path, number_of_statements=2)
+    cache = StatementCache(os.path.join(str(tmp_path), "cache"))
+    calls = []
+
+    def loader(path):
+        calls.append(path)
+        return get_loader(DEBIT)(path)
+
+    expected = get_loader(DEBIT)(paths[0])
+    loaded = cache.load(paths[0], DEBIT, loader)
+    cached = cache.load(paths[0], DEBIT, loader)
+    assert calls == [paths[0]]
+    assert [t.id for t in expected] == [t.id for t in loaded] == [t.id for t in cached]
+    assert [t.description for t in expected] == [t.description for t in cached]
+
+    with open(paths[0], "a") as handle:
+        handle.write("\n01/02/2016,DEB,'00-00-00,99999999,PIZZA,12,,2488")
+    assert len(cache.load(paths[0], DEBIT, loader)) == len(expected) + 1
+    assert calls == [paths[0], paths[0]]
+
+    assert load_transactions_from_statements(paths, DEBIT, cache=cache) == \
+        load_transactions_from_statements(paths, DEBIT)
+
+    cache.max_size_in_bytes = cache.size_in_bytes - 1
+    cache.put(cache.key(paths[1], DEBIT), get_loader(DEBIT)(paths[1]))
+    assert cache.size_in_bytes <= cache.max_size_in_bytes
+    assert cache.get(cache.key(paths[1], DEBIT)) is not None
+
+
+def test_compile_line_parser():
+    columns = get_current_account_statement_columns()
+    generic = get_line_parser_from_ordered_dict(columns)
+    tokens = "30/01/2016,DEB,'00-00-00,99999999, RANDOM PUB ,8.5,,4417.22,".split(",")
+
+    assert compile_line_parser(columns)(tokens) == generic(tokens)
+    assert compile_line_parser(columns)(tokens[:3]) == generic(tokens[:3])
+    assert compile_line_parser(columns, "tuple")(tokens) == tuple(generic(tokens).values())
+    assert compile_line_parser(columns, current_account_statement_values_to_transaction)(tokens) == \
+        current_account_statement_values_to_transaction(**generic(tokens))
+
+    with pytest.raises(ValueError):
+        compile_line_parser(columns, "tuple")(tokens[:3])
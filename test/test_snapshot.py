@@ -0,0 +1,61 @@
+import os
+from datetime import date
+
+import pytest
+from bank_statement_wizard.domain import Ledger, LedgerSnapshot, save_ledger_snapshot, DateRange, DateRangeElement, \
+    Inclusivity, get_category_stats_for_ledger
+
+
+def test_snapshot(tmp_path, transactions):
+    path = os.path.join(str(tmp_path), "ledger.snapshot")
+    ledger = Ledger().add_transactions(transactions())
+    save_ledger_snapshot(ledger, path)
+
+    with LedgerSnapshot(path) as snapshot:
+        assert len(snapshot) == len(ledger)
+        assert snapshot.amounts.tolist() == [t.amount for t in ledger.transactions]
+
+        third = snapshot.transaction(2)
+        assert (third.id, third.description, third.info, third.category) == \
+            (ledger.transactions[2].id, "SALÁRIO", "FPI", None)
+        assert snapshot.transaction(3)._description is None
+        assert [t._generate_id() for t in snapshot.transactions()] == [t.id for t in ledger.transactions]
+
+        loaded = snapshot.to_ledger()
+        assert [t.id for t in loaded.transactions] == [t.id for t in ledger.transactions]
+        assert str(loaded) == str(ledger)
+
+        date_range = DateRange(start=DateRangeElement(date=date(2018, 1, 2), inclusivity=Inclusivity.closed),
+                               end=DateRangeElement(date=date(2018, 1, 3), inclusivity=Inclusivity.open))
+        assert [t.description for t in snapshot.to_ledger(date_range).transactions] == ["RENT"]
+
+    save_ledger_snapshot(Ledger(), path)
+    with LedgerSnapshot(path) as snapshot:
+        assert len(snapshot) == 0 and len(snapshot.to_ledger()) == 0
+
+
+def test_snapshot_ledger(tmp_path, transactions):
+    path = os.path.join(str(tmp_path), "ledger.snapshot")
+    ledger = Ledger().add_transactions(transactions())
+    save_ledger_snapshot(ledger, path)
+
+    snapshot = LedgerSnapshot(path)
+    snapshot_ledger = snapshot.ledger()
+    columns, expected = snapshot_ledger.columns(), ledger.columns()
+    assert {k: list(v) for k, v in columns.items()} == {k: list(v) for k, v in expected.items()}
+    assert snapshot_ledger.transaction_ids == ledger.transaction_ids
+    assert snapshot_ledger.transaction(2).id == ledger.transactions[2].id
+    assert get_category_stats_for_ledger(snapshot_ledger.view([0, 1, 3])) == \
+        get_category_stats_for_ledger(ledger.view([0, 1, 3]))
+    assert str(snapshot_ledger) == str(ledger)
+    assert snapshot_ledger._transactions is None
+
+    amounts = snapshot.amounts
+    with pytest.raises(ValueError):
+        snapshot.close()
+    assert snapshot.amounts.tolist() == amounts.tolist()
+    del amounts
+    snapshot.close()
+    with pytest.raises(ValueError):
+        snapshot_ledger.balance_history
+
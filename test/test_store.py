@@ -0,0 +1,32 @@
+import os
+from datetime import date
+
+from bank_statement_wizard.domain import Ledger, SqliteLedgerStore, DateRange, DateRangeElement, Inclusivity
+
+
+def test_store(tmp_path, transactions):
+    path = os.path.join(str(tmp_path), "ledger.db")
+    expected = Ledger().add_transactions(transactions())
+
+    with SqliteLedgerStore(path, batch_size=3) as store:
+        store.add_transactions(transactions())
+        store.add_transactions(transactions())
+        assert len(store) == len(expected)
+
+    with SqliteLedgerStore(path) as store:
+        ledger = store.load_ledger()
+        assert [t.id for t in ledger.transactions] == [t.id for t in expected.transactions]
+        assert [t.id for t in ledger.transactions] == [t._generate_id() for t in ledger.transactions]
+        assert [t.category for t in ledger.transactions] == [t.category for t in expected.transactions]
+        assert str(ledger) == str(expected)
+
+        assert [t.description for t in store.query(category="regular")] == ["RENT"]
+        assert len(store.query(max_amount=0.0)) == 2
+        date_range = DateRange(start=DateRangeElement(date=date(2018, 1, 1), inclusivity=Inclusivity.open),
+                               end=DateRangeElement(date=date(2018, 1, 3), inclusivity=Inclusivity.closed))
+        assert len(store.load_ledger(date_range=date_range)) == 3
+
+        ledger.transactions[-1].category = "gift"
+        store.update_categories(ledger.transactions)
+        assert [t.amount for t in store.query(category="gift")] == [37.0]
+        assert set(store.categories()) == {"eating_out", "regular", "gift", None}